@@ -1,10 +1,18 @@
 import asyncio
 import json
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, StreamingResponse
+import os
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from uuid import uuid4
-from fastapi.staticfiles import StaticFiles
+
+import metrics
+from prompt_store import prompt_store_from_env
+from runs import RunRegistry, SingleFlight
+from static_cache import StaticCache
+from streaming import coalesce_tokens
 
 # Simple wrapper to mimic a minimal CopilotKit interface
 try:
@@ -24,17 +32,113 @@ class SimpleCopilotKit:
     def get_agent(self, name: str):
         return self._agents.get(name)
 
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
+kit = SimpleCopilotKit()
+_crew_lock = threading.Lock()
+
+
+def load_crew_agent():
+    """
+    Import ``iterative_crew`` and register the crew agent on first use.
+
+    crewai is slow to import, so the app does not touch it until the first
+    stream (or the optional warm-up) and workers start serving immediately.
+    """
+    with _crew_lock:
+        agent = kit.get_agent("crew")
+        if agent is None:
+            from iterative_crew import CopilotCrewAgent, warm_up
+
+            warm_up()
+            agent = CopilotCrewAgent(speculative_review=os.environ.get("CREW_SPECULATIVE_REVIEW") == "1")
+            kit.register_agent("crew", agent)
+        return agent
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # CREW_WARMUP=1 loads the crew in the background once the worker is up,
+    # so the first request does not pay for it and startup is not delayed
+    warm_up = None
+    if os.environ.get("CREW_WARMUP") == "1":
+        warm_up = asyncio.create_task(asyncio.to_thread(load_crew_agent))
+    yield
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# The UI is served from memory (see static_cache.py). index.html is always
+# revalidated so edits show up on the next load; other assets may be reused
+# for STATIC_MAX_AGE seconds without asking.
+STATIC = StaticCache("static")
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", "3600"))
+
+# Prompts waiting for their stream, keyed by a short ID (see prompt_store.py;
+# PROMPT_STORE=sqlite shares them between uvicorn workers)
+PROMPTS = prompt_store_from_env()
+
+# Tokens are batched into one SSE frame per agent until either limit is hit.
+# Set SSE_FLUSH_INTERVAL=0 to send every token in its own frame.
+SSE_FLUSH_INTERVAL = float(os.environ.get("SSE_FLUSH_INTERVAL", "0.016"))
+SSE_FLUSH_CHARS = int(os.environ.get("SSE_FLUSH_CHARS", "2048"))
+
+# Runs are decoupled from connections (see runs.py): each keeps its last
+# RUN_BUFFER_EVENTS frames so a reconnecting client can resume, and stays
+# readable for RUN_RETENTION seconds after it ends. A run left without
+# readers for RUN_CANCEL_GRACE seconds is cancelled along with its LLM
+# calls; clients are told to reconnect after SSE_RETRY_MS, well within it.
+RUNS = RunRegistry(
+    buffer_size=int(os.environ.get("RUN_BUFFER_EVENTS", "4096")),
+    retention=float(os.environ.get("RUN_RETENTION", "60")),
+    cancel_grace=float(os.environ.get("RUN_CANCEL_GRACE", "1.0")),
+)
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", "250"))
+# A viewer on /runs/{id}/events that falls more than RUN_VIEWER_MAX_LAG frames
+# behind skips the oldest ones instead of holding up or bloating anything.
+RUN_VIEWER_MAX_LAG = int(os.environ.get("RUN_VIEWER_MAX_LAG", "512"))
+
+metrics.gauge("app_runs_active", "Runs still producing events.").set_function(lambda: RUNS.active)
+metrics.gauge("app_stream_readers", "SSE connections following a run.").set_function(lambda: RUNS.readers)
+# read by the sync /metrics handler, in the threadpool: len() of the SQLite
+# store is a query that can wait on another worker's write
+metrics.gauge("app_prompts_pending", "Prompts waiting for their first stream.").set_function(lambda: len(PROMPTS))
+
+# runs being started by /stream, by id, so concurrent requests for one id
+# wait for the same prompt read instead of one of them getting 204
+STARTING: dict[str, asyncio.Task] = {}
+# Identical prompts (ignoring case and whitespace) share one in-flight run in
+# this worker; SINGLE_FLIGHT=0 gives every /start its own refinement.
+SINGLE_FLIGHT = (
+    SingleFlight(RUNS, PROMPTS, STARTING) if os.environ.get("SINGLE_FLIGHT", "1") == "1" else None
+)
+SINGLE_FLIGHT_JOINS = metrics.counter(
+    "app_single_flight_joins_total", "/start calls that joined an identical prompt's run."
+)
+# /start runs in the threadpool; this keeps its find-then-claim atomic
+START_LOCK = threading.Lock()
+
+
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+def index(request: Request) -> Response:
+    return STATIC.response(request, "index.html", "no-cache")
+
 
-# In-memory store for prompts keyed by a short ID
-PROMPTS: dict[str, str] = {}
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+def static(path: str, request: Request) -> Response:
+    return STATIC.response(request, path, f"public, max-age={STATIC_MAX_AGE}")
 
 
-@app.get("/", response_class=HTMLResponse)
-def index() -> HTMLResponse:
-    with open("static/index.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(f.read())
+@app.get("/healthz")
+def healthz() -> dict:
+    """Liveness probe; answers before the crew has been loaded."""
+    return {"status": "ok", "crew_loaded": kit.get_agent("crew") is not None}
+
+
+@app.get("/metrics")
+def metrics_endpoint() -> Response:
+    """Prometheus metrics of this worker (see ``metrics.py``)."""
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 class PromptIn(BaseModel):
@@ -42,14 +146,38 @@ class PromptIn(BaseModel):
 
 
 @app.post("/start")
-async def start(prompt_in: PromptIn) -> dict[str, str]:
-    """Store the prompt and return a short ID for streaming."""
-    pid = uuid4().hex
-    PROMPTS[pid] = prompt_in.prompt
-    return {"id": pid}
+def start(prompt_in: PromptIn) -> dict[str, str]:
+    """
+    Store the prompt and return a short ID for streaming.
+
+    A prompt identical to one that is waiting for its stream or still being
+    refined gets that run's ID, so every requester follows the same run.
+    A sync handler, so the prompt store's SQLite writes stay off the event loop.
+    """
+    with START_LOCK:
+        if SINGLE_FLIGHT is not None:
+            existing = SINGLE_FLIGHT.find(prompt_in.prompt)
+            if existing is not None:
+                SINGLE_FLIGHT_JOINS.inc()
+                return {"id": existing}
 
+        # shed load up front rather than queueing kickoffs without bound;
+        # before the crew is loaded nothing can be queued yet
+        kickoffs = getattr(kit.get_agent("crew"), "kickoffs", None)
+        if kickoffs is not None and not kickoffs.has_capacity():
+            raise HTTPException(
+                status_code=503,
+                detail=f"{kickoffs.queue_depth} crew runs are already queued",
+                headers={"Retry-After": "5"},
+            )
+        pid = uuid4().hex
+        PROMPTS.put(pid, prompt_in.prompt)
+        if SINGLE_FLIGHT is not None:
+            SINGLE_FLIGHT.claim(prompt_in.prompt, pid)
+        return {"id": pid}
 
-async def fake_agent_stream(prompt: str):
+
+async def fake_agent_stream(prompt: str, session_id: str):
     """Simulate streaming tokens from two agents."""
     messages = [
         ("agent1", f"Received prompt: {prompt}"),
@@ -64,40 +192,126 @@ async def fake_agent_stream(prompt: str):
             await asyncio.sleep(0.2)
 
 
-async def copilot_agent_stream(prompt: str):
+async def copilot_agent_stream(prompt: str, session_id: str):
     """Yield tokens from a CopilotKit agent if available."""
     if kit is None:
         raise RuntimeError("CopilotKit is not installed")
 
-    # Retrieve the streaming crew agent registered below
-    agent = kit.get_agent("crew")
-    async for agent_name, token, run in agent.stream(prompt):
+    # Retrieve the streaming crew agent, importing crewai off the event loop
+    # the first time
+    agent = kit.get_agent("crew") or await asyncio.to_thread(load_crew_agent)
+    async for agent_name, token, run in agent.stream(prompt, session_id=session_id):
         yield agent_name, token, run
 
 
-@app.get("/stream/{pid}")
-async def stream(pid: str):
-    """Stream tokens for the prompt associated with ``pid``."""
-    prompt = PROMPTS.pop(pid, None)
-    if prompt is None:
-        return StreamingResponse(iter(()), media_type="text/event-stream")
+async def with_payloads(source):
+    """Attach each event's JSON payload, serialized once for all of its readers."""
+    async for agent, token, run_no in source:
+        yield agent, token, run_no, json.dumps({"agent": agent, "token": token, "run": run_no})
+
 
-    async def event_generator():
-        stream_fn = copilot_agent_stream if kit else fake_agent_stream
-        async for agent, token, run in stream_fn(prompt):
-            data = json.dumps({"agent": agent, "token": token, "run": run})
-            yield f"data: {data}\n\n"
+def compact_backlog(events: list) -> list:
+    """
+    Merge a reader's backlog into as few frames as possible.
+
+    Consecutive tokens of one agent and pass become one frame, and of several
+    ``draft_partial`` snapshots in a row only the last is kept, since each
+    supersedes the one before. Every frame keeps the id of its last event.
+    """
+    groups: list = []  # [id of last event, first event's item, tokens]
+    for seq, item in events:
+        agent, token, run_no, _ = item
+        if groups:
+            last = groups[-1]
+            if agent == last[1][0] and run_no == last[1][2]:
+                if agent == "draft_partial":
+                    last[0], last[1] = seq, item
+                    continue
+                if agent != "draft":
+                    last[0] = seq
+                    last[2].append(token)
+                    continue
+        groups.append([seq, item, [token]])
+    return [
+        (seq, item) if len(tokens) == 1 else (seq, (item[0], "".join(tokens), item[2], None))
+        for seq, item, tokens in groups
+    ]
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+async def sse_frames(run, after: int, max_lag=None):
+    """SSE text for ``run`` after event ``after``, one chunk per batch of events."""
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+    async for dropped, events in run.batches(after, max_lag):
+        frames = []
+        if dropped:
+            frames.append(f"event: dropped\ndata: {json.dumps({'count': dropped})}\n\n")
+        for seq, (agent, token, run_no, payload) in compact_backlog(events) if len(events) > 1 else events:
+            if payload is None:
+                payload = json.dumps({"agent": agent, "token": token, "run": run_no})
+            frames.append(f"id: {seq}\ndata: {payload}\n\n")
+        yield "".join(frames)
+    yield f"id: {run.last_id}\nevent: done\ndata: {{}}\n\n"
+
+
+def _last_event_id(request: Request) -> int:
+    try:
+        return int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        return 0
+
+
+async def start_run(pid: str):
+    """Take the prompt of ``pid`` from the store and start its run, or ``None``."""
+    # pop is a SQLite write transaction with PROMPT_STORE=sqlite
+    prompt = await asyncio.to_thread(PROMPTS.pop, pid)
+    if prompt is None:
+        return None
+    stream_fn = copilot_agent_stream if kit else fake_agent_stream
+    return RUNS.start(
+        pid,
+        with_payloads(
+            coalesce_tokens(stream_fn(prompt, pid), interval=SSE_FLUSH_INTERVAL, max_chars=SSE_FLUSH_CHARS)
+        ),
+    )
+
+
+@app.get("/stream/{pid}")
+async def stream(pid: str, request: Request):
+    """
+    Stream the events of run ``pid``, starting its crew on first request.
 
-# Instantiate and register the crew agent
-from iterative_crew import CopilotCrewAgent
+    Every frame carries an ``id:``. A reconnecting ``EventSource`` sends the
+    last one back as ``Last-Event-ID`` and continues from the run's buffer
+    instead of starting over; the final ``done`` event tells it to stop.
+    """
+    run = RUNS.get(pid)
+    if run is None:
+        starting = STARTING.get(pid)
+        if starting is None:
+            starting = STARTING[pid] = asyncio.create_task(start_run(pid))
+            starting.add_done_callback(lambda _: STARTING.pop(pid, None))
+        # shielded: a client that disconnects meanwhile must not lose the
+        # prompt, its reconnect finds the run started
+        run = await asyncio.shield(starting)
+        if run is None:
+            # 204 tells EventSource not to reconnect to an unknown or expired run
+            return Response(status_code=204)
+    return StreamingResponse(sse_frames(run, _last_event_id(request)), media_type="text/event-stream")
 
-if RealCopilotKit:
-    kit = SimpleCopilotKit()
-else:
-    kit = SimpleCopilotKit()
 
-kit.register_agent("crew", CopilotCrewAgent())
+@app.get("/runs/{pid}/events")
+async def run_events(pid: str, request: Request):
+    """
+    Watch a run that has already started, without starting anything.
 
+    Viewers read the same buffer as the run's own stream, from the first
+    event, so they see the slide being built from the start. A viewer more
+    than ``RUN_VIEWER_MAX_LAG`` frames behind gets a ``dropped`` event with
+    the number of frames it skipped.
+    """
+    run = RUNS.get(pid)
+    if run is None:
+        return Response(status_code=204)
+    return StreamingResponse(
+        sse_frames(run, _last_event_id(request), RUN_VIEWER_MAX_LAG), media_type="text/event-stream"
+    )
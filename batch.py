@@ -0,0 +1,161 @@
+"""
+Refine many research prompts in one go, checkpointing each finished slide.
+
+Input is a JSONL file with one ``{"id": ..., "research": ...}`` object per line
+(``id`` defaults to the line number). Every finished slide is appended to the
+output JSONL as ``{"id", "slide", "passes_saved", "seconds"}`` and flushed to
+disk immediately, so re-running the same command after a crash only
+processes the items that are not in the output yet.
+
+    python batch.py prompts.jsonl slides.jsonl --concurrency 2
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional, Tuple
+
+from iterative_crew import build_crew
+
+
+def read_items(path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Yield ``(id, research)`` pairs from the input JSONL.
+
+    A line that is not an object with a string ``research`` yields
+    ``(id, None)`` instead of stopping the batch, with ``line <n>`` as the id
+    if it has none of its own.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield f"line {lineno}", None
+                continue
+            if not isinstance(item, dict):
+                yield f"line {lineno}", None
+                continue
+            research = item.get("research")
+            yield str(item.get("id", lineno)), research if isinstance(research, str) else None
+
+
+def completed_ids(path: str) -> set[str]:
+    """Ids already checkpointed in ``path``; a torn last line is ignored."""
+    done: set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            # anything but a checkpoint object (``null``, a list) is not ours
+            if isinstance(record, dict) and "id" in record:
+                done.add(str(record["id"]))
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 2,
+    threshold: int = 5,
+    max_iters: int = 3,
+    candidates: int = 1,
+    llm=None,
+) -> dict[str, int]:
+    """
+    Refine every pending item of ``input_path`` into ``output_path``.
+
+    Items run on ``concurrency`` worker threads, each with its own crew from
+    ``build_crew``. Failed items and malformed input lines are reported and
+    left out of the output so the next run retries them; a repeated id is
+    refined once. Returns counts of done, skipped and failed.
+    """
+    done = completed_ids(output_path)
+    # only this input's items count as skipped, not every id the output has seen
+    summary = {"done": 0, "skipped": 0, "failed": 0}
+    pending: list[Tuple[str, str]] = []
+    seen: set[str] = set()
+    for item_id, research in read_items(input_path):
+        if research is None:
+            print(f"[{item_id}] failed: not an object with a research string")
+            summary["failed"] += 1
+        elif item_id in seen:
+            print(f"[{item_id}] duplicate id; only its first item is refined")
+        elif item_id in done:
+            seen.add(item_id)
+            summary["skipped"] += 1
+        else:
+            seen.add(item_id)
+            pending.append((item_id, research))
+
+    def refine(item_id: str, research: str) -> dict:
+        t0 = time.perf_counter()
+        crew = build_crew(llm)
+        slide = crew.refine_until_good(research, threshold=threshold, max_iters=max_iters, candidates=candidates)
+        return {
+            "id": item_id,
+            "slide": slide.model_dump(),
+            "passes_saved": crew.passes_saved,
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="batch"
+    ) as pool:
+        if out.tell() and not _ends_with_newline(output_path):
+            # terminate a line torn by a crash so the next record starts clean
+            out.write("\n")
+        futures = {pool.submit(refine, item_id, research): item_id for item_id, research in pending}
+        for future in as_completed(futures):
+            item_id = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f"[{item_id}] failed: {e}")
+                summary["failed"] += 1
+                continue
+            # results are written from this thread only, one durable line each
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            summary["done"] += 1
+            print(f"[{item_id}] done in {record['seconds']}s ({summary['done']}/{len(pending)})")
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of research prompts")
+    parser.add_argument("output", help="JSONL file finished slides are appended to")
+    parser.add_argument("--concurrency", type=int, default=2, help="refinements running at once")
+    parser.add_argument("--threshold", type=int, default=5)
+    parser.add_argument("--max-iters", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=1, help="best-of-N drafts per pass")
+    args = parser.parse_args()
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        threshold=args.threshold,
+        max_iters=args.max_iters,
+        candidates=args.candidates,
+    )
+    print(f"done={summary['done']} skipped={summary['skipped']} failed={summary['failed']}")
+    raise SystemExit(1 if summary["failed"] else 0)
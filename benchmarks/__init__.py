@@ -0,0 +1,2 @@
+"""Load tests and micro-benchmarks. Run from the repo root, e.g.
+``python -m benchmarks.load_test``."""
@@ -0,0 +1,166 @@
+"""
+Fake Ollama server that streams canned slide and review JSON, for load tests
+without a GPU or model.
+
+Answers follow the same rules as ``benchmarks.stub_llm``: the ``MARK-<hex>``
+marker of a research prompt is echoed back, and prompts that mention more
+than one marker are recorded as leaks. Chunks are produced deterministically
+at a configurable rate, so runs are comparable.
+
+    python -m benchmarks.fake_ollama --port 11435 --chunk-delay 0.01
+    CREW_OLLAMA_URL=http://127.0.0.1:11435 CREW_LLM_BACKEND=ollama uvicorn app:app
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+MARKER_RE = re.compile(r"MARK-[0-9a-f]+")
+
+
+def canned_answer(text: str, trailer: str = "") -> str:
+    """
+    The analyst or manager answer for a prompt, tagged with its marker.
+
+    ``trailer`` is prose the analyst appends after its JSON, which a
+    speculative review should cut off.
+    """
+    markers = sorted(set(MARKER_RE.findall(text)))
+    marker = markers[0] if markers else "MARK-none"
+    if "Review the provided slide" in text:
+        payload = {
+            "rating": 3,
+            "comments": [{"element": "title", "comment": f"Sharpen {marker}"}],
+            "summary": f"Review for {marker}",
+        }
+    else:
+        payload = {
+            "title": f"Slide {marker}",
+            "subtitle": f"About {marker}",
+            "sections": [
+                {"section_title": f"Section {marker}", "section_bullets": [f"Bullet {marker}", "Second bullet"]}
+            ],
+        }
+        if trailer:
+            return "Thought: I now can give a great answer\nFinal Answer: " + json.dumps(payload) + "\n\n" + trailer
+    return "Thought: I now can give a great answer\nFinal Answer: " + json.dumps(payload)
+
+
+def split_chunks(answer: str, words: int = 1) -> list[str]:
+    """Split ``answer`` every ``words`` words so markers are never cut in half."""
+    pieces = re.findall(r"\S+\s*", answer)
+    return ["".join(pieces[i : i + words]) for i in range(0, len(pieces), words)]
+
+
+class FakeOllama:
+    """
+    Canned-answer model plus the counters a load test checks afterwards.
+
+    ``first_token_delay`` stands in for prompt evaluation, ``chunk_delay`` is
+    the gap between streamed chunks of ``chunk_words`` words each, and
+    ``trailer`` is prose appended after every slide (see ``canned_answer``).
+    """
+
+    def __init__(
+        self, first_token_delay: float = 0.05, chunk_delay: float = 0.005, chunk_words: int = 1, trailer: str = ""
+    ):
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_words = chunk_words
+        self.trailer = trailer
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+        self.leaks: list[set[str]] = []
+        self._lock = threading.Lock()
+
+    def _start(self, text: str) -> list[str]:
+        markers = set(MARKER_RE.findall(text))
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            if len(markers) > 1:
+                self.leaks.append(markers)
+        return split_chunks(canned_answer(text, self.trailer), self.chunk_words)
+
+    async def stream(self, text: str, frame) -> AsyncIterator[bytes]:
+        """NDJSON lines in Ollama's streaming format, ``frame(chunk, done)`` per line."""
+        chunks = self._start(text)
+        started = time.perf_counter_ns()
+        try:
+            await asyncio.sleep(self.first_token_delay)
+            for chunk in chunks:
+                yield (json.dumps(frame(chunk, False)) + "\n").encode("utf-8")
+                await asyncio.sleep(self.chunk_delay)
+            final = frame("", True)
+            final.update(
+                total_duration=time.perf_counter_ns() - started,
+                prompt_eval_count=len(text) // 4,
+                eval_count=len(chunks),
+            )
+            yield (json.dumps(final) + "\n").encode("utf-8")
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def create_app(fake: FakeOllama) -> FastAPI:
+    """The subset of the Ollama API that crewai, litellm and ``OllamaBackend`` use."""
+    api = FastAPI()
+
+    @api.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        text = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+
+        def frame(chunk: str, done: bool) -> dict:
+            return {"model": model, "message": {"role": "assistant", "content": chunk}, "done": done}
+
+        return StreamingResponse(fake.stream(text, frame), media_type="application/x-ndjson")
+
+    @api.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+
+        def frame(chunk: str, done: bool) -> dict:
+            return {"model": model, "response": chunk, "done": done}
+
+        return StreamingResponse(fake.stream(str(body.get("prompt", "")), frame), media_type="application/x-ndjson")
+
+    @api.post("/api/show")
+    async def show():
+        return {"modelfile": "", "parameters": "", "template": "{{ .Prompt }}", "details": {}, "model_info": {}}
+
+    @api.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "fake-slide:latest", "model": "fake-slide:latest"}]}
+
+    @api.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-fake"}
+
+    return api
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="seconds before the first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="seconds between chunks")
+    parser.add_argument("--chunk-words", type=int, default=1, help="words per chunk")
+    args = parser.parse_args()
+    fake = FakeOllama(args.first_token_delay, args.chunk_delay, args.chunk_words)
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
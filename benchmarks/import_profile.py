@@ -0,0 +1,73 @@
+"""
+Report where import time goes when a worker starts, using ``-X importtime``.
+
+Each target is imported in a fresh interpreter. The report shows the wall
+time of the import and the slowest top-level packages by cumulative time,
+then how long the first-use crew construction (``iterative_crew.warm_up``)
+takes once crewai is loaded.
+
+    python -m benchmarks.import_profile --top 10
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+TARGETS = ("app", "iterative_crew")
+
+
+def profile_import(module: str) -> tuple[float, dict[str, int]]:
+    """Wall seconds to import ``module`` and cumulative microseconds per top-level package."""
+    t0 = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - t0
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    packages: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # only top-level entries, which have no indentation before the name
+        if name.startswith("  "):
+            continue
+        top = name.strip().split(".")[0]
+        packages[top] = packages.get(top, 0) + int(cumulative)
+    return elapsed, packages
+
+
+def profile_warm_up() -> float:
+    """Seconds spent by ``warm_up`` after ``iterative_crew`` has been imported."""
+    code = (
+        "import time, iterative_crew\n"
+        "t0 = time.perf_counter()\n"
+        "iterative_crew.warm_up()\n"
+        "print(time.perf_counter() - t0)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"warm_up failed:\n{result.stderr[-2000:]}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(top: int) -> None:
+    for module in TARGETS:
+        elapsed, packages = profile_import(module)
+        print(f"import {module}: {elapsed * 1000:8.1f} ms wall (interpreter start included)")
+        for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+            print(f"    {name:<28} {us / 1000:8.1f} ms")
+    print(f"iterative_crew.warm_up(): {profile_warm_up() * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10, help="packages listed per target")
+    args = parser.parse_args()
+    main(args.top)
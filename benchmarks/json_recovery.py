@@ -0,0 +1,170 @@
+"""
+Compare the single-pass ``lenient_json.parse_lenient`` with the previous
+``_extract_json`` cascade on a corpus of malformed LLM outputs.
+
+Each ``corpus/json/<name>.txt`` fixture has a ``<name>.expected.json`` with
+the object it must parse to, so the corpus doubles as a regression check:
+the script exits non-zero if ``parse_lenient`` gets any fixture wrong.
+
+    python -m benchmarks.json_recovery --repeat 200
+"""
+
+import argparse
+import ast
+import json
+import time
+from pathlib import Path
+
+from lenient_json import StreamingJSONParser, parse_lenient
+
+CORPUS = Path(__file__).parent / "corpus" / "json"
+
+
+def legacy_extract_json(blob: str) -> dict:
+    """The recovery cascade ``IterativeCrew._extract_json`` used before."""
+
+    def _convert_single_quotes(s: str) -> str:
+        result: list[str] = []
+        in_string = False
+        i = 0
+        while i < len(s):
+            c = s[i]
+            if c == "'":
+                if not in_string:
+                    result.append('"')
+                    in_string = True
+                else:
+                    prev = s[i - 1] if i > 0 else ""
+                    nxt = s[i + 1] if i + 1 < len(s) else ""
+                    if prev == "\\":
+                        result.append("'")
+                    elif nxt.isalpha():
+                        result.append("'")
+                    else:
+                        result.append('"')
+                        in_string = False
+            elif c == '"' and in_string:
+                result.append('\\"')
+            else:
+                result.append(c)
+            i += 1
+        return "".join(result)
+
+    def _strip_outer_braces(text: str) -> str:
+        trimmed = text.strip()
+        while trimmed.startswith("{{") and trimmed.endswith("}}"):
+            trimmed = trimmed[1:-1].strip()
+        return trimmed
+
+    try:
+        return json.loads(blob)
+    except json.JSONDecodeError:
+        pass
+
+    trimmed = blob.strip()
+    start = trimmed.find("{")
+    end = trimmed.rfind("}")
+    candidate = trimmed[start : end + 1] if start != -1 and end != -1 and end > start else trimmed
+    candidate = candidate.replace("```", "")
+    candidate = _strip_outer_braces(candidate)
+
+    for attempt in [candidate, _convert_single_quotes(candidate)]:
+        try:
+            return json.loads(attempt)
+        except json.JSONDecodeError:
+            fix = attempt
+            braces = fix.count("{") - fix.count("}")
+            if braces > 0:
+                fix += "}" * braces
+            brackets = fix.count("[") - fix.count("]")
+            if brackets > 0:
+                fix += "]" * brackets
+            try:
+                return json.loads(fix)
+            except json.JSONDecodeError:
+                continue
+
+    try:
+        return ast.literal_eval(candidate)
+    except Exception as e:
+        raise ValueError(f"Unable to parse JSON from:\n{blob}") from e
+
+
+def load_corpus() -> dict[str, tuple[str, object]]:
+    """Map fixture name to (raw LLM output, expected object)."""
+    corpus = {}
+    for path in sorted(CORPUS.glob("*.txt")):
+        expected = json.loads(path.with_suffix(".expected.json").read_text(encoding="utf-8"))
+        corpus[path.stem] = (path.read_text(encoding="utf-8"), expected)
+    return corpus
+
+
+def check(parse, corpus: dict[str, tuple[str, object]]) -> dict[str, str]:
+    """Classify each fixture as ``ok``, ``wrong`` (parsed, but not as expected) or ``FAIL``."""
+    status = {}
+    for name, (blob, expected) in corpus.items():
+        try:
+            status[name] = "ok" if parse(blob) == expected else "wrong"
+        except Exception:
+            status[name] = "FAIL"
+    return status
+
+
+def parse_chunked(blob: str, size: int) -> object:
+    """Feed ``blob`` to the streaming parser ``size`` characters at a time."""
+    try:
+        return json.loads(blob)
+    except json.JSONDecodeError:
+        pass
+    parser = StreamingJSONParser()
+    for start in range(0, len(blob), size):
+        parser.feed(blob[start : start + size])
+    return parser.finish()
+
+
+def bench(parse, corpus: dict[str, tuple[str, object]], repeat: int) -> float:
+    """Total seconds to parse every fixture ``repeat`` times."""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for blob, _ in corpus.values():
+            try:
+                parse(blob)
+            except Exception:
+                pass
+    return time.perf_counter() - t0
+
+
+def main(repeat: int) -> int:
+    corpus = load_corpus()
+    total_kb = sum(len(blob) for blob, _ in corpus.values()) * repeat / 1024
+    parsers = (("cascade", legacy_extract_json), ("single", parse_lenient))
+    status = {name: check(fn, corpus) for name, fn in parsers}
+
+    print(f"{'fixture':<30} {'cascade':>8} {'single':>8}")
+    for fixture in corpus:
+        print(f"{fixture:<30} {status['cascade'][fixture]:>8} {status['single'][fixture]:>8}")
+    for name, fn in parsers:
+        seconds = bench(fn, corpus, repeat)
+        correct = sum(v == "ok" for v in status[name].values())
+        print(
+            f"{name:<8} correct={correct}/{len(corpus)} "
+            f"time={seconds * 1000:8.1f} ms  throughput={total_kb / seconds:8.0f} KiB/s"
+        )
+
+    # the stream parser must agree with the one-shot parse at any chunking
+    chunking = [
+        f"{fixture} (chunks of {size})"
+        for size in (1, 2, 7, 64)
+        for fixture, (blob, expected) in corpus.items()
+        if parse_chunked(blob, size) != expected
+    ]
+    for failure in chunking:
+        print(f"streaming mismatch: {failure}")
+    return 0 if all(v == "ok" for v in status["single"].values()) and not chunking else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    raise SystemExit(main(args.repeat))
@@ -0,0 +1,213 @@
+"""
+Drive many concurrent ``/start`` + ``/stream`` pairs against ``app.py`` with a
+stub LLM and check that sessions do not leak into each other.
+
+``--backend stub`` answers in-process. ``ollama`` and ``litellm`` start the
+fake Ollama server from ``benchmarks.fake_ollama`` on a local port and go
+through the real HTTP client, end to end. ``--reconnect-after N`` drops
+every connection after N chunks and resumes it with ``Last-Event-ID``; the
+collected text must still be complete. ``--duplicates N`` submits every
+prompt N times at once; with single-flight on, the copies must share one run
+and stream identical text. ``--viewers N`` attaches N watchers to every run
+through ``/runs/{id}/events``; each must see the same text as the run's own
+stream without adding LLM calls. ``--speculative`` makes the fake analyst
+append prose after its slide and turns on the speculative review, which must
+cut that prose off without truncating the manager's review.
+
+    python -m benchmarks.load_test --sessions 20 --max-iters 2
+    python -m benchmarks.load_test --backend ollama --llm-concurrency 4
+    python -m benchmarks.load_test --reconnect-after 3
+    python -m benchmarks.load_test --duplicates 5
+    python -m benchmarks.load_test --viewers 10
+    python -m benchmarks.load_test --backend litellm --speculative
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from uuid import uuid4
+
+import uvicorn
+from starlette.requests import Request
+
+import app
+from iterative_crew import CopilotCrewAgent
+from llm_backend import LiteLLMBackend, OllamaBackend
+
+from benchmarks.fake_ollama import FakeOllama, create_app
+from benchmarks.stub_llm import MARKER_RE, StubLLM
+
+# prose the fake analyst appends after its slide under --speculative
+TRAILER = "TRAILER " + "and some closing remarks " * 20
+
+
+def _request(last_event_id: int) -> Request:
+    headers = [(b"last-event-id", str(last_event_id).encode())] if last_event_id else []
+    return Request({"type": "http", "headers": headers})
+
+
+def _read_chunk(chunk, text: dict[str, str]) -> tuple[int, bool]:
+    """Add the tokens in one SSE chunk to ``text``; return its last id and whether the run is done."""
+    if isinstance(chunk, bytes):
+        chunk = chunk.decode()
+    last_id = 0
+    for frame in chunk.split("\n\n"):
+        if "event: done" in frame:
+            return last_id, True
+        if "event: dropped" in frame:
+            text["dropped"] = "yes"
+            continue
+        for line in frame.splitlines():
+            if line.startswith("id: "):
+                last_id = int(line[len("id: "):])
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                text[data["agent"]] = text.get(data["agent"], "") + data["token"]
+    return last_id, False
+
+
+async def watch(run_id: str) -> dict[str, str]:
+    """Follow a started run through ``/runs/{id}/events`` and collect its text."""
+    text: dict[str, str] = {}
+    response = await app.run_events(run_id, _request(0))
+    async for chunk in response.body_iterator:
+        if _read_chunk(chunk, text)[1]:
+            break
+    await response.body_iterator.aclose()
+    return text
+
+
+async def run_session(marker: str, reconnect_after: int = 0, viewers: int = 0) -> list[dict[str, str]]:
+    """
+    Run one prompt through the endpoints and collect the text per agent.
+
+    With ``reconnect_after`` the connection is dropped after that many
+    chunks and reopened with ``Last-Event-ID``, like a browser after a
+    network blip. The texts seen by ``viewers`` watchers follow the
+    session's own text in the result.
+    """
+    # a sync handler, which FastAPI runs in its threadpool
+    started = await asyncio.to_thread(app.start, app.PromptIn(prompt=f"Research brief {marker}"))
+    text: dict[str, str] = {}
+    watchers = []
+    last_id = 0
+    done = False
+    while not done:
+        response = await app.stream(started["id"], _request(last_id))
+        if not watchers:
+            watchers = [asyncio.create_task(watch(started["id"])) for _ in range(viewers)]
+        chunks = 0
+        async for chunk in response.body_iterator:
+            seen, done = _read_chunk(chunk, text)
+            last_id = seen or last_id
+            if done:
+                break
+            chunks += 1
+            if reconnect_after and chunks >= reconnect_after:
+                break
+        await response.body_iterator.aclose()
+    return [text, *await asyncio.gather(*watchers)]
+
+
+def start_fake_server(fake: FakeOllama) -> str:
+    """Serve ``fake`` on a free local port in a daemon thread; return its URL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(fake), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def main(
+    sessions: int,
+    max_iters: int,
+    delay: float,
+    backend: str,
+    llm_concurrency: int,
+    reconnect_after: int,
+    duplicates: int = 1,
+    viewers: int = 0,
+    speculative: bool = False,
+) -> int:
+    if backend == "stub":
+        llm = answers = StubLLM(delay=delay)
+    else:
+        answers = FakeOllama(first_token_delay=delay * 10, chunk_delay=delay, trailer=TRAILER if speculative else "")
+        url = start_fake_server(answers)
+        if backend == "ollama":
+            llm = OllamaBackend(model="ollama/fake-slide", base_url=url, max_concurrency=llm_concurrency)
+        else:
+            llm = LiteLLMBackend(model="ollama/fake-slide", base_url=url, stream=True)
+    app.kit.register_agent("crew", CopilotCrewAgent(max_iters=max_iters, llm=llm, speculative_review=speculative))
+
+    markers = [f"MARK-{uuid4().hex[:12]}" for _ in range(sessions)]
+    t0 = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_session(m, reconnect_after, viewers) for m in markers for _ in range(duplicates))
+    )
+    elapsed = time.perf_counter() - t0
+
+    failures = []
+    for i, marker in enumerate(markers):
+        copies = [copy for session in results[i * duplicates : (i + 1) * duplicates] for copy in session]
+        if any(copy != copies[0] for copy in copies[1:]):
+            failures.append(f"{marker}: duplicates or viewers streamed different text")
+        text = copies[0]
+        if f"Review for {marker}" not in text.get("manager", ""):
+            failures.append(f"{marker}: final review missing or belongs to another session")
+        if speculative and "TRAILER" in text.get("analyst", ""):
+            failures.append(f"{marker}: speculative review did not cut off the analyst")
+        for agent, streamed in text.items():
+            foreign = set(MARKER_RE.findall(streamed)) - {marker}
+            if foreign:
+                failures.append(f"{marker}: {agent} tokens from {sorted(foreign)}")
+    for leaked in answers.leaks:
+        failures.append(f"crew inputs mixed sessions: {sorted(leaked)}")
+
+    if backend != "stub":
+        print(f"backend={backend} peak concurrent LLM calls={answers.peak_active}")
+    print(
+        f"sessions={sessions} duplicates={duplicates} viewers={viewers} max_iters={max_iters} "
+        f"llm_calls={answers.calls} elapsed={elapsed:.2f}s"
+    )
+    for failure in failures:
+        print(f"LEAK {failure}")
+    print("OK" if not failures else f"FAILED ({len(failures)} problems)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--max-iters", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=0.002, help="seconds between stub chunks")
+    parser.add_argument("--backend", choices=("stub", "ollama", "litellm"), default="stub")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="calls in flight on the ollama backend")
+    parser.add_argument("--reconnect-after", type=int, default=0, help="drop and resume every N chunks")
+    parser.add_argument("--duplicates", type=int, default=1, help="submit every prompt N times at once")
+    parser.add_argument("--viewers", type=int, default=0, help="watchers per run on /runs/{id}/events")
+    parser.add_argument("--speculative", action="store_true", help="cut the analyst off once its slide is complete")
+    args = parser.parse_args()
+    if args.speculative and args.backend == "stub":
+        parser.error("--speculative needs --backend ollama or litellm")
+    raise SystemExit(
+        asyncio.run(
+            main(
+                args.sessions,
+                args.max_iters,
+                args.delay,
+                args.backend,
+                args.llm_concurrency,
+                args.reconnect_after,
+                args.duplicates,
+                args.viewers,
+                args.speculative,
+            )
+        )
+    )
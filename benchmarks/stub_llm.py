@@ -0,0 +1,61 @@
+"""Deterministic stand-in for the Ollama model used by load tests."""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.llms.base_llm import BaseLLM
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events import LLMStreamChunkEvent
+
+from benchmarks.fake_ollama import MARKER_RE, canned_answer, split_chunks
+
+
+class StubLLM(BaseLLM):
+    """
+    Answer analyst and manager prompts with canned JSON in-process.
+
+    Each research prompt carries a ``MARK-<hex>`` marker. The stub echoes the
+    marker back in its answers and records any call whose prompt mentions
+    more than one marker, which would mean state leaked between sessions.
+    """
+
+    def __init__(self, delay: float = 0.002):
+        super().__init__(model="stub/slide-crew")
+        self.delay = delay
+        self.calls = 0
+        self.leaks: list[set[str]] = []
+        self._lock = threading.Lock()
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        text = messages if isinstance(messages, str) else "\n".join(
+            str(m.get("content", "")) for m in messages
+        )
+        markers = set(MARKER_RE.findall(text))
+        with self._lock:
+            self.calls += 1
+            if len(markers) > 1:
+                self.leaks.append(markers)
+        answer = canned_answer(text)
+
+        # stream word by word so markers are never split across chunks
+        for piece in split_chunks(answer):
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=piece))
+            if self.delay:
+                time.sleep(self.delay)
+        return answer
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 8192
@@ -0,0 +1,72 @@
+"""
+Compare token delivery latency of the old 50 ms polling loop with
+``streaming.TokenBridge`` using a synthetic chunk emitter thread.
+
+    python -m benchmarks.token_bridge --chunks 500 --max-gap 0.02
+"""
+
+import argparse
+import asyncio
+import queue
+import random
+import statistics
+import threading
+import time
+
+from streaming import TokenBridge
+
+
+def emit(put, close, chunks: int, max_gap: float, seed: int) -> None:
+    """Emit ``chunks`` timestamps with random gaps, like an LLM stream."""
+    rng = random.Random(seed)
+    for _ in range(chunks):
+        time.sleep(rng.uniform(0, max_gap))
+        put(time.perf_counter())
+    close()
+
+
+async def polling(chunks: int, max_gap: float, seed: int) -> list[float]:
+    """The previous loop: ``queue.Queue.get_nowait`` plus ``asyncio.sleep(0.05)``."""
+    q: queue.Queue = queue.Queue()
+    t = threading.Thread(target=emit, args=(q.put, lambda: None, chunks, max_gap, seed))
+    t.start()
+    latencies = []
+    while t.is_alive() or not q.empty():
+        try:
+            sent = q.get_nowait()
+            latencies.append(time.perf_counter() - sent)
+        except queue.Empty:
+            await asyncio.sleep(0.05)
+    t.join()
+    return latencies
+
+
+async def bridged(chunks: int, max_gap: float, seed: int) -> list[float]:
+    bridge = TokenBridge(asyncio.get_running_loop())
+    t = threading.Thread(target=emit, args=(bridge.put, bridge.close, chunks, max_gap, seed))
+    t.start()
+    latencies = []
+    async for sent in bridge:
+        latencies.append(time.perf_counter() - sent)
+    t.join()
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{name:<8} n={len(ms):<5} p50={statistics.median(ms):7.3f} ms  p99={p99:7.3f} ms  max={ms[-1]:7.3f} ms")
+
+
+async def main(chunks: int, max_gap: float, seed: int) -> None:
+    report("polling", await polling(chunks, max_gap, seed))
+    report("bridge", await bridged(chunks, max_gap, seed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--max-gap", type=float, default=0.02, help="max seconds between chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunks, args.max_gap, args.seed))
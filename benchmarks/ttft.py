@@ -0,0 +1,150 @@
+"""
+Time-to-first-token per refinement pass against a running Ollama server,
+with the prefix-stable ``create_page`` prompt and with the previous layout
+that put the research, draft and feedback at the top.
+
+Prompts are assembled the way crewai lays out an agent call (system message
+with role, backstory and goal, then the task description and expected
+output), so only the order of static and per-pass text differs. Ollama
+reports ``prompt_eval_count``, the number of prompt tokens it actually had to
+evaluate; tokens served from its prompt cache are not counted.
+
+    python -m benchmarks.ttft --runs 3 --passes 4
+"""
+
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+
+from iterative_crew import OLLAMA_SETTINGS, analyst, create_page, manager, review_slide
+
+RESEARCH = [
+    "Why are mid-size US regional banks losing deposits to money market funds?",
+    "What is driving the slowdown in European heat pump installations?",
+    "How should a grocery chain respond to the growth of discount retailers?",
+    "Where can a telecom operator cut costs in its field service operations?",
+]
+_VARIABLE_MARK = "You must consider any existing drafts or feedback."
+LEGACY_GOAL = "Develop a compelling slide based on unstructured research for: {research}."
+
+
+def _system(agent, goal: str) -> str:
+    return f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {goal}"
+
+
+def _user(description: str, expected_output: str, context: str = "") -> str:
+    prompt = (
+        f"\nCurrent Task: {description}\n\n"
+        f"This is the expected criteria for your final answer: {expected_output}\n"
+        "you MUST return the actual complete content as the final answer, not a summary."
+    )
+    if context:
+        prompt += f"\n\nThis is the context you're working with:\n{context}"
+    return prompt + "\n\nBegin!"
+
+
+def analyst_messages(layout: str, research: str, draft: str, feedback: str) -> list[dict]:
+    """System and user messages of an analyst pass in the given layout."""
+    description = create_page.description
+    static, variable = description.split(_VARIABLE_MARK)
+    values = {"research": research, "current_plan": draft, "feedback": feedback}
+    variable = (_VARIABLE_MARK + variable).format(**values)
+    if layout == "legacy":
+        goal = LEGACY_GOAL.format(research=research)
+        _, _, rest = static.partition("\n")
+        description = (
+            f"Use provided research to produce the structure of a PowerPoint slide in response to the prompt: {research}.\n"
+            f"{variable}\n\n{rest.rstrip()}"
+        )
+    else:
+        goal = analyst.goal
+        description = static + variable
+    return [
+        {"role": "system", "content": _system(analyst, goal)},
+        {"role": "user", "content": _user(description, create_page.expected_output)},
+    ]
+
+
+def review_messages(draft: str) -> list[dict]:
+    return [
+        {"role": "system", "content": _system(manager, manager.goal)},
+        {"role": "user", "content": _user(review_slide.description, review_slide.expected_output, draft)},
+    ]
+
+
+def synthetic_pass(research: str, i: int) -> tuple[str, str]:
+    """A draft and feedback that change every pass, as in a real refinement."""
+    if i == 1:
+        return json.dumps({"title": "", "subtitle": "", "sections": []}), ""
+    sections = [
+        {
+            "section_title": f"Driver {s + 1} (rev {i})",
+            "section_bullets": [f"**Finding {s + 1}.{b + 1}** for {research[:40]} moved {10 * b + i}%" for b in range(3)],
+        }
+        for s in range(3)
+    ]
+    draft = {"title": f"{research[:60]} (pass {i})", "subtitle": "Three drivers explain the gap", "sections": sections}
+    feedback = "\n".join(f"Driver {s + 1}: quantify the bullets, pass {i}" for s in range(3))
+    return json.dumps(draft, separators=(",", ":")), feedback
+
+
+def chat(base_url: str, model: str, messages: list[dict], options: dict, keep_alive: str) -> tuple[float, int]:
+    """Stream one chat call; return seconds to the first token and prompt tokens evaluated."""
+    body = json.dumps(
+        {"model": model, "messages": messages, "stream": True, "keep_alive": keep_alive, "options": options}
+    ).encode("utf-8")
+    request = urllib.request.Request(f"{base_url}/api/chat", data=body, headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    first = None
+    evaluated = 0
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if first is None and event.get("message", {}).get("content"):
+                first = time.perf_counter() - t0
+            if event.get("done"):
+                evaluated = event.get("prompt_eval_count", 0)
+    return (first if first is not None else time.perf_counter() - t0), evaluated
+
+
+def run(layout: str, args, model: str, options: dict) -> dict[int, list[tuple[float, int]]]:
+    results: dict[int, list[tuple[float, int]]] = {i: [] for i in range(1, args.passes + 1)}
+    for research in RESEARCH[: args.runs]:
+        for i in range(1, args.passes + 1):
+            draft, feedback = synthetic_pass(research, i)
+            results[i].append(chat(args.base_url, model, analyst_messages(layout, research, draft, feedback), options, args.keep_alive))
+            if args.review:
+                # the manager's call in between competes for the same cache
+                chat(args.base_url, model, review_messages(draft), options, args.keep_alive)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=OLLAMA_SETTINGS["base_url"])
+    parser.add_argument("--model", default=OLLAMA_SETTINGS["model"].removeprefix("ollama/"))
+    parser.add_argument("--keep-alive", default=OLLAMA_SETTINGS["keep_alive"])
+    parser.add_argument("--num-ctx", type=int, default=OLLAMA_SETTINGS.get("num_ctx", 8192))
+    parser.add_argument("--runs", type=int, default=3, help="research prompts, one refinement each")
+    parser.add_argument("--passes", type=int, default=4)
+    parser.add_argument("--no-review", dest="review", action="store_false", help="skip the manager call between passes")
+    args = parser.parse_args()
+
+    # only the prompt is timed, so a single generated token is enough
+    options = {"num_ctx": args.num_ctx, "num_predict": 1, "temperature": 0}
+    chat(args.base_url, args.model, [{"role": "user", "content": "warm up"}], options, args.keep_alive)
+
+    for layout in ("legacy", "stable"):
+        results = run(layout, args, args.model, options)
+        for i, samples in results.items():
+            ttft = statistics.median(s[0] for s in samples) * 1000
+            evaluated = statistics.mean(s[1] for s in samples)
+            print(f"{layout:<7} pass {i}  ttft p50={ttft:8.1f} ms  prompt tokens evaluated={evaluated:7.0f}")
+
+
+if __name__ == "__main__":
+    main()
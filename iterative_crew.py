@@ -1,23 +1,42 @@
-from pydantic import BaseModel, Field
-from typing import List, AsyncGenerator, Tuple
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
+from typing import Callable, List, AsyncGenerator, Optional, Tuple
+from contextlib import contextmanager
+import contextvars
+import difflib
+import functools
 import json
-import ast
+import re
 import asyncio
+import os
 import threading
-import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from uuid import uuid4
 
 # crewai exposes the event bus directly from the events module
 from crewai.utilities.events import crewai_event_bus
 from crewai.utilities.events import LLMStreamChunkEvent, AgentExecutionStartedEvent
 
-from crewai import Crew, Agent, Task, LLM
+from crewai import Crew, Agent, Task
 
-# Use a local Ollama instance for all LLM interactions
-ollama_llm = LLM(
+import llm_cache
+import metrics
+from lenient_json import StreamingJSONParser, is_slide_milestone, parse_lenient
+from llm_backend import llm_from_env
+from streaming import CallControl, TokenBridge, controlled
+
+# Use a local Ollama instance for all LLM interactions. keep_alive holds the
+# model (and its prompt cache) in memory between passes; num_ctx must fit the
+# whole prompt or Ollama truncates its start and the cached prefix is lost.
+OLLAMA_SETTINGS = dict(
     model="ollama/qwen2.5:3b_lcg",
-    base_url="http://localhost:11434",
+    base_url=os.environ.get("CREW_OLLAMA_URL", "http://localhost:11434"),
     stream=True,
+    keep_alive=os.environ.get("CREW_OLLAMA_KEEP_ALIVE", "30m"),
 )
+if os.environ.get("CREW_OLLAMA_NUM_CTX"):
+    OLLAMA_SETTINGS["num_ctx"] = int(os.environ["CREW_OLLAMA_NUM_CTX"])
+
 
 class SlideSection(BaseModel):
     section_title: str
@@ -38,456 +57,1072 @@ class SlideReview(BaseModel):
     summary: str
 
 
-# Analyst agent
-analyst = Agent(
-    role="McKinsey Business Analyst",
-    goal="Develop a compelling slide based on unstructured research for: {research}.",
-    backstory=(
-        "As a Business Analyst at McKinsey & Company, you collaborate with consulting teams to address complex client challenges.\n"
-        "Your strengths include:\n"
-        "- Gathering information from multiple sources (client data, market research, expert interviews);\n"
-        "- Structuring complex problems using MECE principles (Mutually Exclusive, Collectively Exhaustive);\n"
-        "- Developing hypotheses and iterating them through rigorous analysis;\n"
-        "- Communicating insights clearly and professionally.\n\n"
-        "You follow McKinsey's hypothesis-driven approach and ensure each insight is backed by evidence.\n"
-        "Your biggest strength is your ability to take feedback and directly take it into account"
-    ),
-    verbose=True,
-    allow_delegation=False,
-    llm=ollama_llm
-)
+# Names built on first access by the module ``__getattr__`` below, so that
+# importing this module does not construct the LLM client, the agents or the
+# tasks (see ``warm_up``).
+_TEMPLATE_NAMES = ("ollama_llm", "analyst", "create_page", "manager", "review_slide")
+_templates: dict = {}
+_templates_lock = threading.Lock()
+
+
+def _build_templates() -> dict:
+    # CREW_LLM_BACKEND picks crewai's litellm client or the pooled Ollama client
+    # (see llm_backend.py); either can answer repeated prompts from disk (see
+    # llm_cache.py), and with CREW_LLM_CACHE_MODE=replay never calls Ollama at all.
+    ollama_llm = llm_from_env(OLLAMA_SETTINGS)
+
+    # Analyst agent
+    analyst = Agent(
+        role="McKinsey Business Analyst",
+        goal="Develop a compelling slide based on the unstructured research provided in the task.",
+        backstory=(
+            "As a Business Analyst at McKinsey & Company, you collaborate with consulting teams to address complex client challenges.\n"
+            "Your strengths include:\n"
+            "- Gathering information from multiple sources (client data, market research, expert interviews);\n"
+            "- Structuring complex problems using MECE principles (Mutually Exclusive, Collectively Exhaustive);\n"
+            "- Developing hypotheses and iterating them through rigorous analysis;\n"
+            "- Communicating insights clearly and professionally.\n\n"
+            "You follow McKinsey's hypothesis-driven approach and ensure each insight is backed by evidence.\n"
+            "Your biggest strength is your ability to take feedback and directly take it into account"
+        ),
+        verbose=True,
+        allow_delegation=False,
+        llm=ollama_llm
+    )
 
-# Task: create slide structure
-create_page = Task(
-    name="Synthesize unstructured research into PowerPoint slide structure",
-    description=(
-        "Use provided research to produce the structure of a PowerPoint slide in response to the prompt: {research}.\n"
-        "You must consider any existing drafts or feedback:\n"
-        "  draft: {current_plan}\n"
-        "  feedback: {feedback}\n\n"
-        "Follow these guidelines to transform research into action-oriented slides:\n\n"
-        "1. **Understand What Constitutes an Insight**\n"
-        "- Capture a deep understanding: explain *why* something happens, not just *what*.\n"
-        "- Ask “why” repeatedly to uncover meaning that surprises or challenges conventional wisdom.\n"
-        "- Benchmark insights against familiar standards to aid comprehension.\n\n"
-        "2. **Write an Effective Header (Title & Subtitle)**\n"
-        "- Convey one key insight in active voice, summarizing the slide in 1–2 lines.\n"
-        "- Place the most important information at the start.\n"
-        "- Avoid filler phrases like “Based on our analysis.”\n\n"
-        "3. **Craft Impactful Bullets**\n"
-        "- Don’t repeat the header; each bullet must convey a single fact or finding.\n"
-        "- Use active voice and **bold** the first few words of each bullet.\n"
-        "- Limit bullets to ≤3 lines; include 3–8 bullets (use sub-bullets if >5 items).\n"
-        "- Ensure at least two items per list.\n\n"
-        "4. **Apply MECE Principle**\n"
-        "- Make bullets mutually exclusive and collectively exhaustive.\n\n"
-        "5. **Eliminate Empty Verbiage**\n"
-        "- Quantify adjectives (e.g., “20% increase” vs. “significant increase”).\n"
-        "- Front-load key information (e.g., “Sales grew 20% in the US”).\n"
-        "- Use bold sparingly for emphasis.\n\n"
-        "6. **Review and Refine**\n"
-        "- Ensure grammatical consistency and correct punctuation.\n"
-        "- Verify bullets do not exceed two lines each.\n"
-        "- Confirm there’s no redundancy between header and bullets.\n\n"
-        "Steps:\n"
-        "1. Read the research to gather facts, perspectives, and data.\n"
-        "2. Derive a central, action-oriented insight (slide title) and supporting subtitle.\n"
-        "3. Organize into 3–5 MECE sections, each with a short section title and 3–7 concise bullets.\n"
-        "4. Make every item standalone, action-oriented, and data-driven.\n"
-        "5. Return a JSON object:\n"
-        "{"
-        "  'title': str,"
-        "  'subtitle': str,"
-        "  'sections': ["
-        "    { 'section_title': str, 'section_bullets': [str, ...] },"
-        "    ..."
-        "  ]"
-        "}"
-    ),
-    expected_output='A JSON with slide "title", "subtitle", and a list of sections containing "section_title" and "section_bullets" where section_bullets do **NOT** contain "*" or "-".',
-    output_pydantic=SlideStructure,
-    agent=analyst
-)
+    # Task: create slide structure
+    create_page = Task(
+        name="Synthesize unstructured research into PowerPoint slide structure",
+        description=(
+            "Use the research below to produce the structure of a PowerPoint slide in response to its prompt.\n"
+            "Follow these guidelines to transform research into action-oriented slides:\n\n"
+            "1. **Understand What Constitutes an Insight**\n"
+            "- Capture a deep understanding: explain *why* something happens, not just *what*.\n"
+            "- Ask “why” repeatedly to uncover meaning that surprises or challenges conventional wisdom.\n"
+            "- Benchmark insights against familiar standards to aid comprehension.\n\n"
+            "2. **Write an Effective Header (Title & Subtitle)**\n"
+            "- Convey one key insight in active voice, summarizing the slide in 1–2 lines.\n"
+            "- Place the most important information at the start.\n"
+            "- Avoid filler phrases like “Based on our analysis.”\n\n"
+            "3. **Craft Impactful Bullets**\n"
+            "- Don’t repeat the header; each bullet must convey a single fact or finding.\n"
+            "- Use active voice and **bold** the first few words of each bullet.\n"
+            "- Limit bullets to ≤3 lines; include 3–8 bullets (use sub-bullets if >5 items).\n"
+            "- Ensure at least two items per list.\n\n"
+            "4. **Apply MECE Principle**\n"
+            "- Make bullets mutually exclusive and collectively exhaustive.\n\n"
+            "5. **Eliminate Empty Verbiage**\n"
+            "- Quantify adjectives (e.g., “20% increase” vs. “significant increase”).\n"
+            "- Front-load key information (e.g., “Sales grew 20% in the US”).\n"
+            "- Use bold sparingly for emphasis.\n\n"
+            "6. **Review and Refine**\n"
+            "- Ensure grammatical consistency and correct punctuation.\n"
+            "- Verify bullets do not exceed two lines each.\n"
+            "- Confirm there’s no redundancy between header and bullets.\n\n"
+            "Steps:\n"
+            "1. Read the research to gather facts, perspectives, and data.\n"
+            "2. Derive a central, action-oriented insight (slide title) and supporting subtitle.\n"
+            "3. Organize into 3–5 MECE sections, each with a short section title and 3–7 concise bullets.\n"
+            "4. Make every item standalone, action-oriented, and data-driven.\n"
+            "5. Return a JSON object:\n"
+            "{"
+            "  'title': str,"
+            "  'subtitle': str,"
+            "  'sections': ["
+            "    { 'section_title': str, 'section_bullets': [str, ...] },"
+            "    ..."
+            "  ]"
+            "}\n\n"
+            # everything that changes between passes goes last, so the static
+            # text above stays a reusable prefix in Ollama's prompt cache
+            "You must consider any existing drafts or feedback.\n"
+            "  research: {research}\n"
+            "  draft: {current_plan}\n"
+            "  feedback: {feedback}"
+        ),
+        expected_output='A JSON with slide "title", "subtitle", and a list of sections containing "section_title" and "section_bullets" where section_bullets do **NOT** contain "*" or "-".',
+        output_pydantic=SlideStructure,
+        agent=analyst
+    )
 
-# Engagement Manager agent
-manager = Agent(
-    role="Engagement Manager",
-    goal="Review a draft slide for structure, clarity, insightfulness, and client-readiness.",
-    backstory=(
-        "You are an Engagement Manager at McKinsey & Company. You are responsible for ensuring the quality and impact of all client-facing materials.\n"
-        "Your expertise lies in:\n"
-        "- Structuring compelling narratives using the Pyramid Principle,\n"
-        "- Distilling complex analysis into clear insights,\n"
-        "- Coaching junior consultants on effective communication,\n"
-        "- Spotting inconsistencies, vague statements, or misaligned messaging.\n\n"
-        "You are methodical, direct, and hold slides to the highest standards of clarity, actionability, and insight. Your job is to flag every issue before a slide reaches the client."
-        "Remember that for every piece of feedback you give, you provide a direct example of what could be improved rather than just commenting."
-    ),
-    verbose=True,
-    allow_delegation=False,
-    llm=ollama_llm
-)
+    # Engagement Manager agent
+    manager = Agent(
+        role="Engagement Manager",
+        goal="Review a draft slide for structure, clarity, insightfulness, and client-readiness.",
+        backstory=(
+            "You are an Engagement Manager at McKinsey & Company. You are responsible for ensuring the quality and impact of all client-facing materials.\n"
+            "Your expertise lies in:\n"
+            "- Structuring compelling narratives using the Pyramid Principle,\n"
+            "- Distilling complex analysis into clear insights,\n"
+            "- Coaching junior consultants on effective communication,\n"
+            "- Spotting inconsistencies, vague statements, or misaligned messaging.\n\n"
+            "You are methodical, direct, and hold slides to the highest standards of clarity, actionability, and insight. Your job is to flag every issue before a slide reaches the client."
+            "Remember that for every piece of feedback you give, you provide a direct example of what could be improved rather than just commenting."
+        ),
+        verbose=True,
+        allow_delegation=False,
+        llm=ollama_llm
+    )
+
+    # Task: review slide
+    review_slide = Task(
+        name="Review and critique a slide for quality and clarity",
+        description=(
+            "Review the provided slide (in JSON format) against 10 dimensions of slide effectiveness:\n\n"
+            "1. **Action Title**\n"
+            "   - Clear and Insightful: Does the title succinctly convey the slide’s main takeaway?\n"
+            "   - Action‐Oriented: Is it phrased as an insight or recommendation (e.g., “Emerging Markets Drive 15% Revenue Growth”)?\n"
+            "   - Standalone Meaning: Can it convey the key message without additional context?\n\n"
+            "2. **Pyramid Principle**\n"
+            "   - Answer First: Is the main conclusion or recommendation up front?\n"
+            "   - Supporting Arguments: Are the key reasons immediately after (e.g., 1. High demand; 2. Regulatory tailwinds; 3. Competitive edge)?\n"
+            "   - Supporting Data: Is detailed evidence provided to substantiate each argument?\n\n"
+            "3. **Key Messages**\n"
+            "   - Prioritization: Are the most critical points highlighted or placed at the top?\n"
+            "   - Brevity: Are messages concise and jargon‐free?\n"
+            "   - Clarity: Are they understandable by someone unfamiliar with the topic?\n"
+            "   - Alignment: Do they directly support the action title?\n\n"
+            "4. **Supporting Text**\n"
+            "   - Relevance: Is every bullet directly tied to its key message?\n"
+            "   - Simplicity: Is the language free of unnecessary complexity?\n"
+            "   - Quantification: Are claims backed by numbers where appropriate?\n"
+            "   - No Redundancy: Is any repeated wording eliminated?\n\n"
+            "5. **Logical Flow**\n"
+            "   - Structure: Does it follow problem → analysis → insight → recommendation?\n"
+            "   - Transitions: Are ideas connected smoothly without abrupt jumps?\n"
+            "   - Hierarchy: Is information ordered from most to least important?\n\n"
+            "6. **Language and Tone**\n"
+            "   - Professional Tone: Is it formal and appropriate for a client?\n"
+            "   - Active Voice: Are sentences direct (e.g., “We recommend reducing costs by 10%”)?\n"
+            "   - Strong Verbs: Are verbs like “drive,” “enable,” “achieve” used?\n"
+            "   - No Ambiguity: Are vague terms replaced with specifics?\n\n"
+            "7. **Data and Insights**\n"
+            "   - Interpretation: Does the text explain the “so what” of each data point?\n"
+            "   - Insightful Commentary: Are insights drawn rather than just facts stated?\n"
+            "   - Focus: Are only the most critical data points included?\n\n"
+            "8. **Consistency**\n"
+            "   - Terminology: Are terms, units, and formats consistent?\n"
+            "   - Numbers: Are percentages, currency, and decimals uniformly formatted?\n"
+            "   - Acronyms: Are they spelled out on first use and then used consistently?\n\n"
+            "9. **Call to Action (if applicable)**\n"
+            "   - Clarity: Is there a clear next step or recommendation?\n"
+            "   - Actionable: Are recommendations specific (e.g., “Launch a pilot in Q3”)?\n\n"
+            "10. **Proofreading**\n"
+            "   - Grammar & Spelling: Any typos or awkward phrasing?\n"
+            "   - Punctuation: Is punctuation consistent and correct?\n"
+            "   - Readability: Does it flow smoothly when read aloud?\n\n"
+            "Return your feedback as a JSON object containing:\n"
+            "- `rating` (1-5),\n"
+            "- `comments`: a list of `{ element: string, comment: string }`,\n"
+            "- `summary`: a final recommendation."
+        ),
+        expected_output=(
+            'A JSON with:'
+            '{'
+            '  "rating": int (1-5) where 4 is passing and 5 is exceptional,'
+            '  "comments": ['
+            '    { "element": str, "comment": str },'
+            '    ...'
+            '  ],'
+            '  "summary": str'
+            '}'
+        ),
+        output_pydantic=SlideReview,
+        agent=manager,
+        context=[create_page]
+    )
+
+    return dict(
+        ollama_llm=ollama_llm,
+        analyst=analyst,
+        create_page=create_page,
+        manager=manager,
+        review_slide=review_slide,
+    )
+
+
+def templates() -> dict:
+    """The shared LLM, agent and task templates, built once on first use."""
+    if not _templates:
+        with _templates_lock:
+            if not _templates:
+                _templates.update(_build_templates())
+    return _templates
+
+
+def warm_up() -> None:
+    """Build the templates ahead of the first request (e.g. at app startup)."""
+    templates()
+
+
+def __getattr__(name: str):
+    if name in _TEMPLATE_NAMES:
+        return templates()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _slide_elements(draft: dict) -> list[str]:
+    """Flatten a slide dict into its title, subtitle, section titles and bullets."""
+    if not isinstance(draft, dict):
+        return []
+    elements = [str(draft.get("title", "")), str(draft.get("subtitle", ""))]
+    for section in draft.get("sections") or []:
+        if not isinstance(section, dict):
+            continue
+        elements.append(str(section.get("section_title", "")))
+        elements.extend(str(b) for b in section.get("section_bullets") or [])
+    return elements
+
+
+# one ``key`` or ``key[index]`` segment of a review element path
+_PATH_SEGMENT = re.compile(r"(\w+)(?:\[(\d+)\])?")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_element_path(element: str) -> Tuple[Tuple[str, Optional[int]], ...]:
+    """Split ``"sections[0].section_bullets[1]"`` into its (key, index) segments."""
+    return tuple((key, int(index) if index else None) for key, index in _PATH_SEGMENT.findall(element))
+
+
+class ElementIndex:
+    """
+    Every element path of one draft, mapped to its value.
+
+    Built in a single walk of the draft, so resolving a review comment is a
+    dict lookup. Indices are 0-based; ``len(list)`` also resolves to the last
+    item, since the manager sometimes counts from 1. Non-string values are
+    serialised on first lookup only.
+    """
+
+    def __init__(self, draft: dict):
+        self.draft = draft
+        self._values: dict[tuple, object] = {}
+        self._text: dict[tuple, str] = {}
+        self._walk(draft, ())
+
+    def _walk(self, obj: dict, prefix: tuple) -> None:
+        for key, value in obj.items():
+            path = prefix + ((str(key), None),)
+            self._values[path] = value
+            if isinstance(value, dict):
+                self._walk(value, path)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    self._add(prefix + ((str(key), i),), item)
+                if value:
+                    self._add(prefix + ((str(key), len(value)),), value[-1])
+
+    def _add(self, path: tuple, item) -> None:
+        self._values[path] = item
+        if isinstance(item, dict):
+            self._walk(item, path)
+
+    def resolve(self, element: str) -> str:
+        """Text of the element at ``element``, or ``element`` itself if there is none."""
+        if not element:
+            return element
+        path = _parse_element_path(element)
+        text = self._text.get(path)
+        if text is not None:
+            return text
+        if path not in self._values:
+            return element
+        value = self._values[path]
+        if isinstance(value, str):
+            text = value
+        else:
+            try:
+                text = json.dumps(value)
+            except (TypeError, ValueError):
+                return element
+        self._text[path] = text
+        return text
+
+
+def _review_elements(review: dict) -> list[str]:
+    return [
+        f"{c.get('element', '')}: {c.get('comment', '')}"
+        for c in review.get("comments") or []
+        if isinstance(c, dict)
+    ]
+
+
+def _words(elements: list[str]) -> list[str]:
+    words: list[str] = []
+    for element in elements:
+        words.extend(element.split())
+        # keeps words from matching across element boundaries
+        words.append("\n")
+    return words
+
+
+def similarity(a: list[str], b: list[str]) -> float:
+    """
+    Word-level similarity of two flattened slides or reviews (0 to 1).
+
+    Whole elements would count a bullet with one changed word as entirely
+    different; words keep a small edit small and a rewrite large.
+    """
+    words_a, words_b = _words(a), _words(b)
+    if not words_a and not words_b:
+        return 1.0
+    return difflib.SequenceMatcher(None, words_a, words_b, autojunk=False).ratio()
+
+
+def has_converged(
+    previous_draft: dict,
+    draft: dict,
+    previous_review: Optional[dict],
+    review: dict,
+    tolerance: float,
+) -> bool:
+    """
+    Whether another pass is unlikely to change anything.
+
+    True when the new draft is (nearly) identical to the previous one and
+    the manager is repeating the same comments. ``tolerance`` is the share
+    of differing words still treated as unchanged.
+    """
+    if previous_review is None:
+        return False
+    floor = 1.0 - tolerance
+    return (
+        similarity(_slide_elements(previous_draft), _slide_elements(draft)) >= floor
+        and similarity(_review_elements(previous_review), _review_elements(review)) >= floor
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for prompt-size reporting."""
+    return (len(text) + 3) // 4
+
+
+# shortest feedback line worth sending once the budget is nearly used up
+_MIN_FEEDBACK_LINE = 16
+
+
+def clip_text(text: str, tokens: int) -> str:
+    """``text`` cut to about ``tokens`` tokens, marked with an ellipsis if shortened."""
+    if estimate_tokens(text) <= tokens:
+        return text
+    return text[: max(tokens * 4 - 1, 0)] + "…"
+
+
+def compact_draft(draft: dict) -> str:
+    """Minified JSON encoding of a draft for interpolation into prompts."""
+    return json.dumps(draft, separators=(",", ":"), ensure_ascii=False)
+
+
+# crewai agents answer "Thought: ...\nFinal Answer: ..."; the thought may
+# quote a draft, e.g. the previous one from the prompt
+FINAL_ANSWER = "Final Answer:"
+
+
+def final_answer(text: str) -> str:
+    """The text after the last ``Final Answer:`` marker, or all of it if there is none."""
+    at = text.rfind(FINAL_ANSWER)
+    return text if at < 0 else text[at + len(FINAL_ANSWER):]
+
+
+class FinalAnswerParser:
+    """
+    ``StreamingJSONParser`` fed only what follows the ``Final Answer:`` marker.
+
+    A marker split across chunks is still found. Until a document is
+    complete, a new marker (crewai re-asking after a malformed answer)
+    starts a fresh parse.
+    """
+
+    def __init__(self, watch: Optional[Callable] = None):
+        self._watch = watch
+        self._parser: Optional[StreamingJSONParser] = None
+        self._tail = ""
+
+    @property
+    def document(self) -> Optional[dict]:
+        return self._parser.document if self._parser is not None else None
+
+    @property
+    def complete(self) -> bool:
+        return self._parser is not None and self._parser.complete
+
+    def feed(self, chunk: str) -> bool:
+        """Consume ``chunk``; return ``True`` if a watched element completed."""
+        text = self._tail + chunk
+        self._tail = text[-(len(FINAL_ANSWER) - 1):]
+        at = text.rfind(FINAL_ANSWER)
+        if at >= 0 and not self.complete:
+            self._parser = StreamingJSONParser(watch=self._watch)
+            chunk = text[at + len(FINAL_ANSWER):]
+        if self._parser is None:
+            return False
+        return self._parser.feed(chunk)
 
-# Task: review slide
-review_slide = Task(
-    name="Review and critique a slide for quality and clarity",
-    description=(
-        "Review the provided slide (in JSON format) against 10 dimensions of slide effectiveness:\n\n"
-        "1. **Action Title**\n"
-        "   - Clear and Insightful: Does the title succinctly convey the slide’s main takeaway?\n"
-        "   - Action‐Oriented: Is it phrased as an insight or recommendation (e.g., “Emerging Markets Drive 15% Revenue Growth”)?\n"
-        "   - Standalone Meaning: Can it convey the key message without additional context?\n\n"
-        "2. **Pyramid Principle**\n"
-        "   - Answer First: Is the main conclusion or recommendation up front?\n"
-        "   - Supporting Arguments: Are the key reasons immediately after (e.g., 1. High demand; 2. Regulatory tailwinds; 3. Competitive edge)?\n"
-        "   - Supporting Data: Is detailed evidence provided to substantiate each argument?\n\n"
-        "3. **Key Messages**\n"
-        "   - Prioritization: Are the most critical points highlighted or placed at the top?\n"
-        "   - Brevity: Are messages concise and jargon‐free?\n"
-        "   - Clarity: Are they understandable by someone unfamiliar with the topic?\n"
-        "   - Alignment: Do they directly support the action title?\n\n"
-        "4. **Supporting Text**\n"
-        "   - Relevance: Is every bullet directly tied to its key message?\n"
-        "   - Simplicity: Is the language free of unnecessary complexity?\n"
-        "   - Quantification: Are claims backed by numbers where appropriate?\n"
-        "   - No Redundancy: Is any repeated wording eliminated?\n\n"
-        "5. **Logical Flow**\n"
-        "   - Structure: Does it follow problem → analysis → insight → recommendation?\n"
-        "   - Transitions: Are ideas connected smoothly without abrupt jumps?\n"
-        "   - Hierarchy: Is information ordered from most to least important?\n\n"
-        "6. **Language and Tone**\n"
-        "   - Professional Tone: Is it formal and appropriate for a client?\n"
-        "   - Active Voice: Are sentences direct (e.g., “We recommend reducing costs by 10%”)?\n"
-        "   - Strong Verbs: Are verbs like “drive,” “enable,” “achieve” used?\n"
-        "   - No Ambiguity: Are vague terms replaced with specifics?\n\n"
-        "7. **Data and Insights**\n"
-        "   - Interpretation: Does the text explain the “so what” of each data point?\n"
-        "   - Insightful Commentary: Are insights drawn rather than just facts stated?\n"
-        "   - Focus: Are only the most critical data points included?\n\n"
-        "8. **Consistency**\n"
-        "   - Terminology: Are terms, units, and formats consistent?\n"
-        "   - Numbers: Are percentages, currency, and decimals uniformly formatted?\n"
-        "   - Acronyms: Are they spelled out on first use and then used consistently?\n\n"
-        "9. **Call to Action (if applicable)**\n"
-        "   - Clarity: Is there a clear next step or recommendation?\n"
-        "   - Actionable: Are recommendations specific (e.g., “Launch a pilot in Q3”)?\n\n"
-        "10. **Proofreading**\n"
-        "   - Grammar & Spelling: Any typos or awkward phrasing?\n"
-        "   - Punctuation: Is punctuation consistent and correct?\n"
-        "   - Readability: Does it flow smoothly when read aloud?\n\n"
-        "Return your feedback as a JSON object containing:\n"
-        "- `rating` (1-5),\n"
-        "- `comments`: a list of `{ element: string, comment: string }`,\n"
-        "- `summary`: a final recommendation."
-    ),
-    expected_output=(
-        'A JSON with:'
-        '{'
-        '  "rating": int (1-5) where 4 is passing and 5 is exceptional,'
-        '  "comments": ['
-        '    { "element": str, "comment": str },'
-        '    ...'
-        '  ],'
-        '  "summary": str'
-        '}'
-    ),
-    output_pydantic=SlideReview,
-    agent=manager,
-    context=[create_page]
-)
 
 # 6) IterativeCrew with draft as dict only
 class IterativeCrew(Crew):
     draft:    dict = Field(default_factory=lambda: {"title":"", "subtitle":"", "sections":[]})
     feedback: str  = ""
-
-    def _resolve_element_text(self, element: str) -> str:
-        """Return the text of the referenced slide element if possible."""
-        obj = self.draft
-        if not element or not isinstance(obj, dict):
-            return element
-
-        import re
-        # split like "sections[0].section_bullets[1]"
-        parts = re.findall(r"(\w+)(?:\[(\d+)\])?", element)
-        for key, index in parts:
-            if isinstance(obj, dict):
-                obj = obj.get(key)
+    # LLM passes skipped by the last refinement because the draft converged
+    passes_saved: int = 0
+    # cap on the feedback interpolated into the next analyst prompt
+    feedback_token_budget: int = 400
+    # estimated prompt tokens sent per pass of the last refinement
+    prompt_tokens: List[int] = Field(default_factory=list)
+    # normalised comments already sent to the analyst in earlier passes
+    _sent_comments: set = PrivateAttr(default_factory=set)
+    # element paths of the draft last used to resolve review comments
+    _element_index: Optional[ElementIndex] = PrivateAttr(default=None)
+
+    def _start_refinement(self) -> None:
+        self.passes_saved = 0
+        self.prompt_tokens = []
+        self._sent_comments = set()
+
+    def _pass_inputs(self, research: str) -> dict:
+        """Kickoff inputs for the next pass, logging the estimated prompt size."""
+        inputs = {
+            "research":     research,
+            # crewai expects strings for interpolation variables
+            "current_plan": compact_draft(self.draft),
+            "feedback":     self.feedback,
+        }
+        tokens = 0
+        for task in self.tasks:
+            template = getattr(task, "_original_description", None) or task.description
+            for name, value in inputs.items():
+                template = template.replace("{" + name + "}", value)
+            tokens += estimate_tokens(template) + estimate_tokens(task.expected_output)
+        self.prompt_tokens.append(tokens)
+        metrics.PROMPT_TOKENS.observe(tokens)
+        print(f"Prompt size for pass {len(self.prompt_tokens)}: ~{tokens} tokens")
+        return inputs
+
+    def _build_feedback(self, review: dict) -> str:
+        """
+        Flatten review comments into the feedback for the next pass.
+
+        Duplicate comments are dropped, and comments already sent in an
+        earlier pass follow the new ones as "Still open" lines with a short
+        element reference. Every kickoff starts afresh, so their comment text
+        stays. The result is cut at ``feedback_token_budget``. An element (which may be a whole
+        section's JSON) takes at most a quarter of the budget, so one comment
+        cannot crowd out the rest. A line that still does not fit is
+        shortened, or skipped if too little room is left; the first comment
+        is always kept.
+        """
+        lines: list[tuple[str, str]] = []
+        still_open: list[tuple[str, str]] = []
+        seen: set[str] = set()
+        for c in review.get("comments", []):
+            if not isinstance(c, dict):
+                continue
+            # element paths were already resolved by _replace_comment_elements
+            element = str(c.get("element", ""))
+            comment = str(c.get("comment", ""))
+            key = " ".join(f"{element} {comment}".lower().split())
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in self._sent_comments:
+                still_open.append((element, comment))
             else:
-                return element
-            if index:
-                num = int(index)
-                try:
-                    obj = obj[num]
-                except (IndexError, ValueError, TypeError):
-                    # fall back to 1-based indexing if 0-based failed
-                    try:
-                        obj = obj[num - 1]
-                    except Exception:
-                        return element
-        if isinstance(obj, str):
-            return obj
-        try:
-            return json.dumps(obj)
-        except Exception:
+                lines.append((element, comment))
+        self._sent_comments |= seen
+
+        element_budget = max(self.feedback_token_budget // 4, _MIN_FEEDBACK_LINE)
+        for element, comment in still_open:
+            # the draft in the prompt shows the element, so a reference will do
+            lines.append((
+                "Still open: " + clip_text(element, _MIN_FEEDBACK_LINE),
+                clip_text(comment, element_budget),
+            ))
+
+        kept: list[str] = []
+        omitted = 0
+        used = 0
+        for element, comment in lines:
+            line = f"{clip_text(element, element_budget)}: {comment}" if element else comment
+            room = self.feedback_token_budget - used - 1
+            if estimate_tokens(line) > room:
+                if kept and room < _MIN_FEEDBACK_LINE:
+                    omitted += 1
+                    continue
+                line = clip_text(line, max(room, _MIN_FEEDBACK_LINE))
+            kept.append(line)
+            used += estimate_tokens(line) + 1
+        if omitted:
+            kept.append(f"(+{omitted} more comments omitted)")
+        return "\n".join(kept)
+
+    def _index_for(self, draft: dict) -> ElementIndex:
+        """Element index of ``draft``, rebuilt only when the draft object changes."""
+        index = self._element_index
+        if index is None or index.draft is not draft:
+            index = self._element_index = ElementIndex(draft)
+        return index
+
+    def _resolve_element_text(self, element: str, draft: Optional[dict] = None) -> str:
+        """Return the text of the referenced slide element if possible."""
+        draft = self.draft if draft is None else draft
+        if not element or not isinstance(draft, dict):
             return element
+        return self._index_for(draft).resolve(element)
 
-    def _replace_comment_elements(self, review: dict) -> dict:
-        """Replace element paths in review comments with the actual text."""
+    def _replace_comment_elements(self, review: dict, draft: Optional[dict] = None) -> dict:
+        """Replace element paths in review comments with the text they point to in ``draft``."""
         for comment in review.get("comments", []):
+            if not isinstance(comment, dict):
+                continue
             elem = comment.get("element")
             if elem:
-                comment["element"] = self._resolve_element_text(elem)
+                comment["element"] = self._resolve_element_text(elem, draft)
         return review
 
     def _extract_json(self, blob: str) -> dict:
         """
         Parse a JSON or JSON-like string produced by the LLM.
 
-        Strategy:
-        1) Try ``json.loads`` directly.
-        2) If that fails, extract the substring between the first ``{"`` and
-           last ``}`` and attempt ``json.loads`` again.
-        3) If single quotes are used and contain unescaped apostrophes (e.g.
-           ``'There's ...'``), convert them to double quotes with a small
-           state machine and retry ``json.loads``.
-        4) As a last resort, fall back to ``ast.literal_eval``.
+        A thin wrapper around ``lenient_json.parse_lenient``: valid JSON goes
+        through ``json.loads``, otherwise a single lenient pass handles code fences,
+        doubled braces, single quotes with apostrophes (e.g. ``'There's
+        ...'``), missing commas and truncated output. Raises ``ValueError``
+        if the text contains no object at all. The parse time and the stage
+        that failed are recorded in ``metrics``.
         """
+        started = time.perf_counter()
+        stage = "strict"
 
-        def _convert_single_quotes(s: str) -> str:
-            """Convert single-quoted JSON to double-quoted JSON."""
-            result: list[str] = []
-            in_string = False
-            i = 0
-            while i < len(s):
-                c = s[i]
-                if c == "'":
-                    if not in_string:
-                        result.append('"')
-                        in_string = True
-                    else:
-                        prev = s[i - 1] if i > 0 else ""
-                        nxt = s[i + 1] if i + 1 < len(s) else ""
-                        if prev == "\\":
-                            # Escaped quote, keep as-is
-                            result.append("'")
-                        elif nxt.isalpha():
-                            # Apostrophe inside a word (e.g. B.C.'s)
-                            result.append("'")
-                        else:
-                            result.append('"')
-                            in_string = False
-                elif c == '"' and in_string:
-                    # Escape double quotes inside a single-quoted string
-                    result.append('\\"')
-                else:
-                    result.append(c)
-                i += 1
-            return "".join(result)
-
-        def _strip_outer_braces(text: str) -> str:
-            """Recursively remove duplicate outer braces."""
-            trimmed = text.strip()
-            while trimmed.startswith("{{") and trimmed.endswith("}}"):
-                trimmed = trimmed[1:-1].strip()
-            return trimmed
+        def repairing() -> None:
+            nonlocal stage
+            metrics.PARSE_FAILURES.inc(stage="strict")
+            stage = "lenient"
 
         try:
-            return json.loads(blob)
-        except json.JSONDecodeError:
-            pass
+            return parse_lenient(blob, on_repair=repairing)
+        except ValueError:
+            metrics.PARSE_FAILURES.inc(stage="lenient")
+            stage = "failed"
+            raise
+        finally:
+            metrics.PARSE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+    def _parse_draft(self, blob: str) -> dict:
+        """
+        Parse the analyst's draft, raising ``ValueError`` unless it is a whole slide.
 
-        # Extract potential JSON substring
-        trimmed = blob.strip()
-        start = trimmed.find("{")
-        end = trimmed.rfind("}")
-        candidate = trimmed[start : end + 1] if start != -1 and end != -1 and end > start else trimmed
+        The lenient parser returns whatever it recovered (``{}`` for a
+        refusal, sections without bullets for a cut-off answer), which must
+        never replace a good draft.
+        """
+        return SlideStructure.model_validate(self._extract_json(blob)).model_dump()
 
-        # remove common code block markers
-        candidate = candidate.replace("```", "")
-        candidate = _strip_outer_braces(candidate)
+    def _parse_review(self, blob: str) -> dict:
+        """Parse the manager's review, raising ``ValueError`` unless it is a ``SlideReview``."""
+        return SlideReview.model_validate(self._extract_json(blob)).model_dump()
 
-        attempts = [candidate, _convert_single_quotes(candidate)]
+    def _parse_pass(self, out, strict: bool = False) -> Tuple[dict, dict]:
+        """
+        Parse a kickoff result into the slide draft and the manager review.
 
-        for attempt in attempts:
-            try:
-                return json.loads(attempt)
-            except json.JSONDecodeError:
-                # try to auto-close brackets and braces if the JSON looks truncated
-                fix = attempt
-                braces = fix.count("{") - fix.count("}")
-                if braces > 0:
-                    fix += "}" * braces
-                brackets = fix.count("[") - fix.count("]")
-                if brackets > 0:
-                    fix += "]" * brackets
-                try:
-                    return json.loads(fix)
-                except json.JSONDecodeError:
-                    continue
+        An unusable draft keeps the previous one and an unusable review
+        counts as rating 0, unless ``strict``, which raises ``ValueError``.
+        """
+        slide_out, review_out = out.tasks_output
 
-        # final fallback
+        # 1) parse the slide draft into a plain dict
         try:
-            return ast.literal_eval(candidate)
-        except Exception as e:
-            raise ValueError(f"Unable to parse JSON from:\n{blob}") from e
+            if getattr(slide_out, "pydantic", None):
+                new_dict = slide_out.pydantic.model_dump()
+            else:
+                new_dict = self._parse_draft(slide_out.raw)
+        except ValueError as e:
+            if strict:
+                raise
+            print(f"Error parsing final analyst output: {e}")
+            new_dict = self.draft
+
+        # 2) parse the manager review
+        try:
+            review_dict = self._parse_review(review_out.raw)
+        except ValueError as e:
+            if strict:
+                raise
+            print(f"Error parsing manager review: {e}")
+            review_dict = {"rating": 0, "comments": [], "summary": ""}
+        review_dict = self._replace_comment_elements(review_dict, new_dict)
+        return new_dict, review_dict
+
+    def _best_of(self, inputs: dict, candidates: int, concurrency: int) -> Tuple[dict, dict]:
+        """
+        Run ``candidates`` draft+review kickoffs at once and keep the best.
 
-    def refine_until_good(self, research: str, threshold: int = 5, max_iters: int = 3) -> SlideStructure:
-        for i in range(1, max_iters+1):
-            print(f"\n––– pass {i} –––")
-            out = self.kickoff({
-                "research":     research,
-                # crewai expects strings for interpolation variables
-                "current_plan": json.dumps(self.draft),
-                "feedback":     self.feedback
-            })
+        Extra candidates run on sibling crews from ``build_crew`` sharing this
+        crew's LLM; at most ``concurrency`` kickoffs hit the endpoint at a time.
+        The highest rating wins, ties going to the review with fewer comments.
+        Each candidate has its own response-cache keys, so they stay distinct.
+        """
+        crews = [self] + [
+            build_crew(self.agents[0].llm, planning=self.planning) for _ in range(candidates - 1)
+        ]
 
-            slide_out, review_out = out.tasks_output
+        def run(index: int, crew: "IterativeCrew") -> Optional[Tuple[dict, dict]]:
+            try:
+                with llm_cache.candidate(index):
+                    return self._parse_pass(crew.kickoff(inputs), strict=True)
+            except Exception as e:
+                print(f"Candidate failed: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crew-candidate") as pool:
+            results = [r for r in pool.map(run, range(len(crews)), crews) if r is not None]
+        if not results:
+            raise RuntimeError(f"all {candidates} candidate drafts failed")
+
+        print("Candidate ratings: " + ", ".join(str(r.get("rating", 0)) for _, r in results))
+        return max(results, key=lambda r: (r[1].get("rating", 0), -len(r[1].get("comments", []))))
+
+    def refine_until_good(
+        self,
+        research: str,
+        threshold: int = 5,
+        max_iters: int = 3,
+        convergence: Optional[float] = 0.02,
+        candidates: int = 1,
+        concurrency: Optional[int] = None,
+    ) -> SlideStructure:
+        """
+        Alternate drafts and reviews until the rating reaches ``threshold``.
 
-            # 1) parse the slide draft into a plain dict
-            if getattr(slide_out, "pydantic", None):
-                new_dict = slide_out.pydantic.model_dump()
+        Stops early once successive drafts and reviews differ by at most
+        ``convergence`` (share of changed words; ``None`` disables it).
+        With ``candidates > 1`` each pass drafts and reviews that many slides
+        concurrently (at most ``concurrency`` at once, default all of them)
+        and carries the best-rated one into the next pass.
+        """
+        self._start_refinement()
+        previous_review = None
+        for i in range(1, max_iters+1):
+            print(f"\n––– pass {i} –––")
+            inputs = self._pass_inputs(research)
+            if candidates > 1:
+                new_dict, review_dict = self._best_of(inputs, candidates, concurrency or candidates)
             else:
-                new_dict = self._extract_json(slide_out.raw)
+                new_dict, review_dict = self._parse_pass(self.kickoff(inputs))
 
-            # 2) parse the manager review
-            review_dict = self._extract_json(review_out.raw)
-            review_dict = self._replace_comment_elements(review_dict)
             rating = review_dict.get("rating", 0)
             print(f"Manager rated: {rating}/5")
 
             if rating >= threshold:
                 print("✅ Threshold reached—done!")
+                metrics.ITERATIONS.observe(i)
                 return SlideStructure(**new_dict)
 
+            if convergence is not None and has_converged(
+                self.draft, new_dict, previous_review, review_dict, convergence
+            ):
+                self.passes_saved = max_iters - i
+                print(f"Draft converged; skipped {self.passes_saved} remaining pass(es).")
+                self.draft = new_dict
+                metrics.ITERATIONS.observe(i)
+                return SlideStructure(**new_dict)
+            previous_review = review_dict
+
             # otherwise update for next pass
             self.draft    = new_dict
-            # flatten comments into a string, resolving element paths to text
-            self.feedback = "\n".join(
-                f"{self._resolve_element_text(c['element'])}: {c['comment']}"
-                for c in review_dict.get("comments", [])
-            )
+            self.feedback = self._build_feedback(review_dict)
 
         print("⚠️ Reached max iterations; returning latest draft.")
+        metrics.ITERATIONS.observe(max_iters)
         return SlideStructure(**self.draft)
 
 
+# run id of the stream pass whose kickoff is executing in the current context
+_current_run: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("crew_run_id", default=None)
+
+
+class EventRouter:
+    """
+    Deliver crewai events only to the stream run that emitted them.
+
+    ``crewai_event_bus`` is process-global, so handlers registered per stream
+    would see every other stream's chunks. The router registers a single
+    handler per event type and looks up the subscriber for the run id bound
+    to the emitting kickoff thread with one dict lookup.
+    """
+
+    EVENT_TYPES = (AgentExecutionStartedEvent, LLMStreamChunkEvent)
+
+    def __init__(self):
+        self._subscribers: dict[str, dict[type, Callable]] = {}
+        self._installed = False
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        """Register the dispatch handler on the global event bus once."""
+        with self._lock:
+            if self._installed:
+                return
+            for event_type in self.EVENT_TYPES:
+                crewai_event_bus.register_handler(event_type, self._dispatch)
+            self._installed = True
+
+    def subscribe(self, run_id: str, handlers: dict[type, Callable]) -> None:
+        """Route events of the given types emitted under ``run_id`` to ``handlers``."""
+        self.install()
+        self._subscribers[run_id] = handlers
+
+    def unsubscribe(self, run_id: str) -> None:
+        self._subscribers.pop(run_id, None)
+
+    @contextmanager
+    def bind(self, run_id: str):
+        """Tag every event emitted in this context with ``run_id``."""
+        token = _current_run.set(run_id)
+        try:
+            yield
+        finally:
+            _current_run.reset(token)
+
+    def _dispatch(self, source, event) -> None:
+        handlers = self._subscribers.get(_current_run.get())
+        if handlers is None:
+            return
+        handler = handlers.get(type(event))
+        if handler is not None:
+            handler(source, event)
+
+
+event_router = EventRouter()
+
+
+def build_crew(llm=None, planning: bool = False) -> IterativeCrew:
+    """
+    Return a fresh ``IterativeCrew`` built from the module-level templates.
+
+    crewai interpolates inputs into agents and tasks in place during
+    ``kickoff``, so every crew gets its own copies of ``analyst``, ``manager``,
+    ``create_page`` and ``review_slide``. ``llm`` optionally replaces the
+    model used by both agents (e.g. a stub in load tests).
+    """
+    t = templates()
+    agents = [t["analyst"].copy(), t["manager"].copy()]
+    if llm is not None:
+        for agent in agents:
+            agent.llm = llm
+
+    task_mapping: dict = {}
+    tasks = []
+    for template in (t["create_page"], t["review_slide"]):
+        task = template.copy(agents, task_mapping)
+        task_mapping[template.key] = task
+        tasks.append(task)
+
+    return IterativeCrew(agents=agents, tasks=tasks, planning=planning)
+
+
+class CrewPool:
+    """Hand out one isolated ``IterativeCrew`` per stream session."""
+
+    def __init__(self, llm=None):
+        self.llm = llm
+        self._crews: dict[str, IterativeCrew] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, session_id: str) -> IterativeCrew:
+        """Return the crew for ``session_id``, building it on first use."""
+        with self._lock:
+            crew = self._crews.get(session_id)
+            if crew is None:
+                crew = build_crew(self.llm)
+                self._crews[session_id] = crew
+            return crew
+
+    def release(self, session_id: str) -> None:
+        """Forget the crew for ``session_id`` once its stream has finished."""
+        with self._lock:
+            self._crews.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._crews)
+
+
+class KickoffRejected(RuntimeError):
+    """Raised when the kickoff queue is full and no more work is admitted."""
+
+
+class KickoffPool:
+    """
+    Bounded executor shared by every stream's crew kickoffs.
+
+    At most ``max_workers`` kickoffs talk to the LLM backend at once and up
+    to ``max_queue`` more wait for a free worker. Past that, admitted
+    submissions raise ``KickoffRejected`` so a burst of ``/start`` requests
+    queues and then sheds load instead of spawning unbounded threads.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-kickoff")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Kickoffs submitted but still waiting for a worker."""
+        return self._queued
+
+    @property
+    def active(self) -> int:
+        """Kickoffs currently running."""
+        return self._active
+
+    def has_capacity(self) -> bool:
+        return self._queued < self.max_queue
+
+    def submit(self, fn: Callable, *args, admit: bool = True) -> Future:
+        """
+        Schedule ``fn(*args)`` on the pool.
+
+        With ``admit=True`` the call is refused when the queue is full; later
+        passes of an already admitted stream use ``admit=False`` so they are
+        never dropped halfway through a refinement.
+        """
+        with self._lock:
+            if admit and self._queued >= self.max_queue:
+                raise KickoffRejected(
+                    f"{self._queued} kickoffs already waiting for {self.max_workers} workers"
+                )
+            self._queued += 1
+
+        def run():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+        future = self._executor.submit(run)
+
+        def on_done(f: Future) -> None:
+            # a future cancelled before it started never ran ``run``
+            if f.cancelled():
+                with self._lock:
+                    self._queued -= 1
+
+        future.add_done_callback(on_done)
+        return future
+
+
+# Shared by all CopilotCrewAgent instances so limits hold across streams.
+kickoff_pool = KickoffPool(
+    max_workers=int(os.environ.get("CREW_MAX_WORKERS", "2")),
+    max_queue=int(os.environ.get("CREW_MAX_QUEUE", "32")),
+)
+metrics.KICKOFF_QUEUE_DEPTH.set_function(lambda: kickoff_pool.queue_depth)
+metrics.KICKOFFS_ACTIVE.set_function(lambda: kickoff_pool.active)
+
+
 class CopilotCrewAgent:
     """Expose the iterative crew as a streaming agent for CopilotKit."""
 
-    def __init__(self, threshold: int = 5, max_iters: int = 3):
+    def __init__(
+        self,
+        threshold: int = 5,
+        max_iters: int = 3,
+        llm=None,
+        max_buffered_tokens: int = 1024,
+        kickoffs: Optional[KickoffPool] = None,
+        convergence: Optional[float] = 0.02,
+        speculative_review: bool = False,
+    ):
         self.name = "crew"
         self.threshold = threshold
         self.max_iters = max_iters
-        self.crew = IterativeCrew(
-            agents=[analyst, manager],
-            tasks=[create_page, review_slide],
-            planning=False,
-        )
-
-    async def stream(self, prompt: str) -> AsyncGenerator[Tuple[str, str, int], None]:
+        # see IterativeCrew.refine_until_good
+        self.convergence = convergence
+        # hand the draft to the manager as soon as a valid slide has streamed,
+        # cutting off whatever prose the analyst adds after the JSON
+        self.speculative_review = speculative_review
+        # each stream session refines its own draft and feedback
+        self.pool = CrewPool(llm)
+        # tokens a kickoff may run ahead of a slow client before it blocks
+        self.max_buffered_tokens = max_buffered_tokens
+        self.kickoffs = kickoffs or kickoff_pool
+
+    async def stream(
+        self, prompt: str, session_id: Optional[str] = None
+    ) -> AsyncGenerator[Tuple[str, str, int], None]:
         """Yield (agent_name, token, run) tuples while refining the slide."""
+        session_id = session_id or uuid4().hex
+        crew = self.pool.acquire(session_id)
+        metrics.STREAMS_ACTIVE.inc()
+        try:
+            async for item in self._stream(crew, prompt):
+                yield item
+        finally:
+            metrics.STREAMS_ACTIVE.dec()
+            self.pool.release(session_id)
+
+    async def _stream(
+        self, crew: IterativeCrew, prompt: str
+    ) -> AsyncGenerator[Tuple[str, str, int], None]:
         research = prompt
+        loop = asyncio.get_running_loop()
+        crew._start_refinement()
+        previous_review = None
+        passes = 0
         for i in range(1, self.max_iters + 1):
-            token_q: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+            # the draft is replaced mid-pass once the analyst finishes
+            previous_draft = crew.draft
+            # time to first token, duration and token rate of each agent's turn
+            timer = metrics.PhaseTimer()
+            token_q = TokenBridge(loop, maxsize=self.max_buffered_tokens)
             current_agent = ""
             analyst_tokens: list[str] = []
             manager_tokens: list[str] = []
+            # parses the analyst's draft as it streams so the UI can show
+            # each section as soon as it closes
+            draft_parser = FinalAnswerParser(watch=is_slide_milestone)
+            draft_cut = False
 
             def on_agent_started(source, event: AgentExecutionStartedEvent) -> None:
                 nonlocal current_agent, analyst_tokens, manager_tokens
                 role = event.agent.role
-                if role == analyst.role:
+                if role == crew.agents[0].role:
                     current_agent = "analyst"
-                elif role == manager.role:
+                    timer.start("analyst")
+                elif role == crew.agents[1].role:
                     if current_agent == "analyst" and analyst_tokens:
                         try:
-                            new_dict = self.crew._extract_json("".join(analyst_tokens))
+                            if draft_parser.complete:
+                                new_dict = SlideStructure.model_validate(draft_parser.document).model_dump()
+                            else:
+                                new_dict = crew._parse_draft(final_answer("".join(analyst_tokens)))
                         except Exception as e:
                             print(f"Error parsing analyst draft: {e}")
                             # keep the last valid draft and display it
-                            token_q.put(("draft", json.dumps(self.crew.draft)))
+                            token_q.put(("draft", json.dumps(crew.draft)))
                         else:
-                            self.crew.draft = new_dict
-                            token_q.put(("draft", json.dumps(self.crew.draft)))
+                            crew.draft = new_dict
+                            token_q.put(("draft", json.dumps(crew.draft)))
                         analyst_tokens = []
                     manager_tokens = []
                     current_agent = "manager"
+                    timer.start("manager")
+
+            def stop_analyst() -> None:
+                nonlocal draft_cut
+                if draft_cut:
+                    return
+                # a completed document never changes, so validate it only once
+                draft_cut = True
+                try:
+                    SlideStructure.model_validate(draft_parser.document)
+                except ValidationError:
+                    return
+                # the backend ends the call and keeps the text streamed so
+                # far as the analyst's answer, so the review starts right away
+                control.stop_generation = True
 
             def on_chunk(source, event: LLMStreamChunkEvent) -> None:
+                timer.token()
                 if current_agent == "analyst":
-                    token_q.put((current_agent, event.chunk))
+                    delivered = token_q.put((current_agent, event.chunk))
                     analyst_tokens.append(event.chunk)
+                    if draft_parser.feed(event.chunk):
+                        token_q.put(("draft_partial", json.dumps(draft_parser.document)))
+                    if self.speculative_review and draft_parser.complete:
+                        stop_analyst()
                 elif current_agent == "manager":
-                    token_q.put((current_agent, event.chunk))
+                    delivered = token_q.put((current_agent, event.chunk))
                     manager_tokens.append(event.chunk)
                 else:
-                    token_q.put((current_agent or "crew", event.chunk))
-
-            with crewai_event_bus.scoped_handlers():
-                crewai_event_bus.register_handler(AgentExecutionStartedEvent, on_agent_started)
-                crewai_event_bus.register_handler(LLMStreamChunkEvent, on_chunk)
-
-                result_container = {}
-
-                def run_kickoff():
-                    result_container["out"] = self.crew.kickoff(
-                        {
-                            "research": research,
-                            "current_plan": json.dumps(self.crew.draft),
-                            "feedback": self.crew.feedback,
-                        }
-                    )
-
-                t = threading.Thread(target=run_kickoff)
-                t.start()
-
-                while t.is_alive() or not token_q.empty():
-                    try:
-                        agent_name, token = token_q.get_nowait()
-                        yield agent_name, token, i
-                    except queue.Empty:
-                        await asyncio.sleep(0.05)
-
-                t.join()
-
-            out = result_container["out"]
-            slide_out, review_out = out.tasks_output
+                    delivered = token_q.put((current_agent or "crew", event.chunk))
+                if not delivered:
+                    # nobody is reading this pass any more
+                    control.cancel()
+
+            # lets the stream stop this pass's LLM calls from the event loop
+            control = CallControl()
+            run_id = uuid4().hex
+            event_router.subscribe(
+                run_id,
+                {
+                    AgentExecutionStartedEvent: on_agent_started,
+                    LLMStreamChunkEvent: on_chunk,
+                },
+            )
 
-            try:
-                if getattr(slide_out, "pydantic", None):
-                    new_dict = slide_out.pydantic.model_dump()
-                else:
-                    new_dict = self.crew._extract_json(slide_out.raw)
-            except Exception as e:
-                print(f"Error parsing final analyst output: {e}")
-                new_dict = self.crew.draft
+            def run_kickoff():
+                # contextvars are per thread, so bind inside the kickoff thread
+                try:
+                    with event_router.bind(run_id), controlled(control):
+                        return crew.kickoff(crew._pass_inputs(research))
+                finally:
+                    token_q.close()
 
+            future = None
             try:
-                review_dict = self.crew._extract_json(review_out.raw)
-                review_dict = self.crew._replace_comment_elements(review_dict)
-            except Exception as e:
-                print(f"Error parsing manager review: {e}")
-                review_dict = {"rating": 0, "comments": [], "summary": ""}
+                try:
+                    future = self.kickoffs.submit(run_kickoff, admit=(i == 1))
+                except KickoffRejected as e:
+                    print(f"Kickoff rejected: {e}")
+                    yield "crew", "The crew is at capacity right now. Please try again shortly.", i
+                    return
+
+                async for agent_name, token in token_q:
+                    yield agent_name, token, i
+
+                out = await asyncio.wrap_future(future)
+                timer.end()
+                passes = i
+            finally:
+                if future is not None and not future.done():
+                    # the consumer went away (client disconnect or run
+                    # cancellation): drop the pass if it is still waiting for
+                    # a worker, otherwise abort its LLM calls
+                    future.cancel()
+                    control.cancel()
+                token_q.abandon()
+                event_router.unsubscribe(run_id)
+
+            new_dict, review_dict = crew._parse_pass(out)
 
             cleaned = json.dumps(review_dict)
-            for ch in cleaned:
-                yield "manager", ch, i
+            yield "manager", cleaned, i
 
             rating = review_dict.get("rating", 0)
 
             # update the current draft after each pass in case parsing during
             # streaming failed for any reason
-            self.crew.draft = new_dict
+            crew.draft = new_dict
 
             if rating >= self.threshold:
                 break
 
+            if self.convergence is not None and has_converged(
+                previous_draft, new_dict, previous_review, review_dict, self.convergence
+            ):
+                crew.passes_saved = self.max_iters - i
+                if crew.passes_saved:
+                    yield (
+                        "crew",
+                        "The draft has stopped changing between iterations; "
+                        f"skipping the remaining {crew.passes_saved} iteration(s).",
+                        i,
+                    )
+                break
+            previous_review = review_dict
+
             # Prepare for the next iteration by updating feedback
-            self.crew.feedback = "\n".join(
-                f"{self.crew._resolve_element_text(c['element'])}: {c['comment']}"
-                for c in review_dict.get("comments", [])
-            )
+            crew.feedback = crew._build_feedback(review_dict)
 
             # Inform the frontend that a new iteration will begin if
             # the threshold hasn't been met and the max iterations allow it
@@ -499,6 +1134,8 @@ class CopilotCrewAgent:
                 )
                 yield "crew", message, i + 1
 
+        if passes:
+            metrics.ITERATIONS.observe(passes)
 
 
 # 7) Run the loop
@@ -625,11 +1262,7 @@ Disputes & Resolutions: Softwood lumber duties persist; EV tax‐credit negotiat
 FDI: Strong inflows into energy, mining, and tech; continued confidence in Canada’s political stability and resource base.
     """
 
-    crew = IterativeCrew(
-        agents=[analyst, manager],
-        tasks=[create_page, review_slide],
-        planning=True
-    )
+    crew = build_crew(planning=True)
     final_slide = crew.refine_until_good(research_report)
     if not final_slide.title:
         final_slide.title = "Untitled Slide"
@@ -0,0 +1,315 @@
+"""Lenient, resumable JSON parsing for LLM output that arrives chunk by chunk."""
+
+import json
+import re
+from typing import Any, Callable, Optional, Tuple
+
+Path = Tuple[Any, ...]
+
+# characters that end a bare literal such as a number, ``true`` or an unquoted key
+_LITERAL_END = set(" \t\r\n,:{}[]\"'`")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "/": "/", "\\": "\\", '"': '"', "'": "'"}
+_STRING_STOP = {'"': re.compile(r'["\\]'), "'": re.compile(r"['\\]")}
+# a quote only ends a string if the next non-blank character is one of these;
+# otherwise it is an apostrophe or an unescaped quote inside the text
+_CLOSE_FOLLOWERS = set(",:}]\n\"'`")
+# after such a comma, a quote that ends a word before the line does
+# ("yes", then left") means the comma was inside the text
+_OPENS_STRING = set(" \t,:[{")
+_KEY, _COLON, _VALUE = "key", "colon", "value"
+
+
+class _Frame:
+    __slots__ = ("container", "path", "key", "bare_key", "expect", "extra_braces")
+
+    def __init__(self, container, path: Path):
+        self.container = container
+        self.path = path
+        self.key: Optional[str] = None
+        self.bare_key = False
+        self.expect = _KEY
+        # ``{{`` from prompt templates: braces opened where a key was expected
+        self.extra_braces = 0
+
+
+class StreamingJSONParser:
+    """
+    Build a JSON object from text fed in arbitrary chunks, in one pass.
+
+    Tolerates the quirks of our local model's output: prose or code fences
+    around the object, single-quoted strings with apostrophes (``'B.C.'s'``),
+    unescaped quotes inside strings, doubled ``{{ }}`` braces, missing or
+    trailing commas, unquoted keys, stray words between members and
+    truncation (open strings are kept, dangling keys dropped, containers
+    closed). Text before the first ``{`` and after the root object closes is
+    ignored.
+
+    ``watch(path)`` is called with the path of every completed value and
+    closed container (e.g. ``("sections", 0, "section_bullets", 1)``); if it
+    returns ``True`` the next ``feed`` reports that the document changed.
+    """
+
+    def __init__(self, watch: Optional[Callable[[Path], bool]] = None):
+        self.document: Optional[dict] = None
+        self.complete = False
+        self._watch = watch
+        self._changed = False
+        self._stack: list[_Frame] = []
+        self._pending = ""
+        self._string: Optional[list[str]] = None
+        self._quote = ""
+        self._literal: Optional[list[str]] = None
+
+    def feed(self, chunk: str) -> bool:
+        """Consume ``chunk``; return ``True`` if a watched element completed."""
+        self._changed = False
+        if not self.complete:
+            self._consume(self._pending + chunk, final=False)
+        return self._changed
+
+    def finish(self) -> Optional[dict]:
+        """Flush buffered text, close anything left open and return the document."""
+        if not self.complete:
+            self._consume(self._pending, final=True)
+            if self._string is not None:
+                self._end_string()
+            if self._literal is not None:
+                self._end_literal()
+            while self._stack:
+                self._close()
+        return self.document
+
+    # -- scanning ---------------------------------------------------------
+
+    def _consume(self, text: str, final: bool) -> None:
+        i, n = 0, len(text)
+        self._pending = ""
+        while i < n and not self.complete:
+            if self._string is not None:
+                i = self._scan_string(text, i, final)
+                if i < 0:
+                    # need more input to decide on an escape or a quote
+                    self._pending = text[-i - 1:]
+                    return
+                continue
+
+            c = text[i]
+            if self._literal is not None:
+                if c not in _LITERAL_END:
+                    self._literal.append(c)
+                    i += 1
+                    continue
+                self._end_literal()
+
+            if not self._stack:
+                if c == "{":
+                    self.document = {}
+                    self._stack.append(_Frame(self.document, ()))
+            elif c in "\"'":
+                self._string, self._quote = [], c
+            elif c == "{":
+                top = self._stack[-1]
+                if isinstance(top.container, dict) and top.expect == _KEY:
+                    top.extra_braces += 1
+                else:
+                    self._open({})
+            elif c == "[":
+                self._open([])
+            elif c == "}":
+                top = self._stack[-1]
+                if isinstance(top.container, dict) and top.extra_braces:
+                    top.extra_braces -= 1
+                else:
+                    # a ``}`` also closes any list left open inside the object
+                    while self._stack and isinstance(self._stack[-1].container, list):
+                        self._close()
+                    if self._stack:
+                        self._close()
+            elif c == "]":
+                while self._stack and isinstance(self._stack[-1].container, dict) and len(self._stack) > 1:
+                    self._close()
+                if self._stack and isinstance(self._stack[-1].container, list):
+                    self._close()
+            elif c == ":":
+                top = self._stack[-1]
+                if isinstance(top.container, dict) and top.expect == _COLON:
+                    top.expect = _VALUE
+            elif c == ",":
+                top = self._stack[-1]
+                if isinstance(top.container, dict):
+                    top.expect = _KEY
+            elif c not in " \t\r\n`":
+                self._literal = [c]
+            i += 1
+
+    def _scan_string(self, text: str, i: int, final: bool) -> int:
+        """Read string content from ``text[i:]``; return the next index or ``-(start+1)`` to wait."""
+        stop = _STRING_STOP[self._quote]
+        while True:
+            m = stop.search(text, i)
+            if m is None:
+                self._string.append(text[i:])
+                return len(text)
+            j = m.start()
+            self._string.append(text[i:j])
+            if text[j] == "\\":
+                if j + 1 >= len(text):
+                    if final:
+                        return len(text)
+                    return -(j + 1)
+                esc = text[j + 1]
+                if esc == "u":
+                    if j + 6 > len(text) and not final:
+                        return -(j + 1)
+                    try:
+                        self._string.append(chr(int(text[j + 2 : j + 6], 16)))
+                        i = j + 6
+                    except ValueError:
+                        self._string.append("u")
+                        i = j + 2
+                    continue
+                self._string.append(_ESCAPES.get(esc, esc))
+                i = j + 2
+                continue
+            closes = self._closes_string(text, j, final)
+            if closes is None:
+                return -(j + 1)
+            if not closes:
+                # ``B.C.'s`` or ``the "so what" of it``: keep the quote as text
+                self._string.append(self._quote)
+                i = j + 1
+                continue
+            self._end_string()
+            return j + 1
+
+    @staticmethod
+    def _closes_string(text: str, j: int, final: bool) -> Optional[bool]:
+        """Whether the quote at ``text[j]`` ends the string; ``None`` to wait for input."""
+        k, n = j + 1, len(text)
+        while k < n and text[k] in " \t\r":
+            k += 1
+        if k >= n:
+            return True if final else None
+        if text[k] != ",":
+            return text[k] in _CLOSE_FOLLOWERS
+        line_end = text.find("\n", k)
+        if line_end < 0:
+            line_end = n
+        q = text.find(text[j], k + 1, line_end)
+        if q < 0:
+            return True if final or line_end < n else None
+        return text[q - 1] in _OPENS_STRING
+
+    # -- building ---------------------------------------------------------
+
+    def _end_string(self) -> None:
+        value = "".join(self._string)
+        self._string = None
+        self._add(value, is_string=True)
+
+    def _end_literal(self) -> None:
+        word = "".join(self._literal)
+        self._literal = None
+        value = _literal_value(word)
+        top = self._stack[-1]
+        if isinstance(value, str) and (isinstance(top.container, list) or top.expect == _VALUE):
+            # an unquoted word is only meaningful as a key; as a value it is
+            # prose (``Note: sections follow``), so drop the member
+            if isinstance(top.container, dict):
+                top.expect = _KEY
+            return
+        self._add(value, is_string=False)
+
+    def _add(self, value: Any, is_string: bool) -> None:
+        top = self._stack[-1]
+        if isinstance(top.container, list):
+            top.container.append(value)
+            self._completed(top.path + (len(top.container) - 1,))
+            return
+        if top.expect == _KEY or (top.expect == _COLON and top.bare_key):
+            # anything but a colon after an unquoted word means the word was
+            # stray prose between members ("yes", then left), so the next
+            # token replaces it as the key candidate instead of its value
+            top.key = value if is_string else str(value)
+            top.bare_key = not is_string
+            top.expect = _COLON
+            return
+        top.container[top.key] = value
+        top.expect = _KEY
+        self._completed(top.path + (top.key,))
+
+    def _open(self, container) -> None:
+        top = self._stack[-1]
+        if isinstance(top.container, list):
+            top.container.append(container)
+            path = top.path + (len(top.container) - 1,)
+        elif top.expect == _KEY:
+            # a container where a key belongs: parse it but keep it detached
+            path = top.path + (None,)
+        else:
+            top.container[top.key] = container
+            top.expect = _KEY
+            path = top.path + (top.key,)
+        self._stack.append(_Frame(container, path))
+
+    def _close(self) -> None:
+        frame = self._stack.pop()
+        if not self._stack:
+            self.complete = True
+        self._completed(frame.path)
+
+    def _completed(self, path: Path) -> None:
+        if self._watch is not None and self._watch(path):
+            self._changed = True
+
+
+def _literal_value(word: str) -> Any:
+    lowered = word.lower()
+    if lowered == "true":
+        return True
+    if lowered == "false":
+        return False
+    if lowered in ("null", "none"):
+        return None
+    try:
+        return int(word)
+    except ValueError:
+        pass
+    try:
+        return float(word)
+    except ValueError:
+        return word
+
+
+def is_slide_milestone(path: Path) -> bool:
+    """Title, subtitle, a section title, a bullet or a whole section completed."""
+    if path in (("title",), ("subtitle",)):
+        return True
+    if len(path) >= 2 and path[0] == "sections" and isinstance(path[1], int):
+        rest = path[2:]
+        return rest in ((), ("section_title",)) or (len(rest) == 2 and rest[0] == "section_bullets")
+    return False
+
+
+def parse_lenient(blob: str, on_repair: Optional[Callable[[], None]] = None) -> dict:
+    """
+    Parse a JSON or JSON-like object produced by the LLM in a single scan.
+
+    Well-formed JSON goes straight through ``json.loads``; anything else is
+    fed once through ``StreamingJSONParser``, which repairs quote style,
+    apostrophes, missing commas and truncation as it reads instead of
+    retrying on progressively patched copies. ``on_repair`` is called before
+    that second stage. Raises ``ValueError`` if no object is found.
+    """
+    try:
+        return json.loads(blob)
+    except json.JSONDecodeError:
+        pass
+    if on_repair is not None:
+        on_repair()
+    parser = StreamingJSONParser()
+    parser.feed(blob)
+    document = parser.finish()
+    if document is None:
+        raise ValueError(f"Unable to parse JSON from:\n{blob}")
+    return document
@@ -0,0 +1,217 @@
+"""
+LLM backends for the crew, selected with ``CREW_LLM_BACKEND``.
+
+``litellm`` (the default) is crewai's own ``LLM``. ``ollama`` talks to
+Ollama's ``/api/chat`` directly over one pooled keep-alive HTTP client per
+backend, with explicit timeouts and a cap on the calls in flight, so every
+agent, candidate and batch worker sharing the backend reuses the same few
+connections instead of opening one per request.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+from crewai import LLM
+from crewai.llms.base_llm import BaseLLM
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events import LLMStreamChunkEvent
+
+from llm_cache import CacheMixin, cache_from_env
+from streaming import GenerationStopped, current_control
+
+# chunks of the LiteLLMBackend call running in the current context, if controlled
+_streamed: contextvars.ContextVar[Optional[list[str]]] = contextvars.ContextVar("litellm_streamed", default=None)
+
+
+class LiteLLMBackend(LLM):
+    """
+    crewai's ``LLM`` honouring the stream's ``CallControl``.
+
+    litellm's streaming loop has no hook of its own, but it emits a chunk
+    event per chunk from the calling thread. ``_between_chunks`` checks the
+    control there and raises past the event bus, which leaves litellm's loop
+    and drops its HTTP response: a cancelled run stops mid-generation, and
+    ``stop_generation`` ends the call with the text received so far.
+    """
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        control = current_control()
+        if control is None:
+            return super().call(messages, tools, callbacks, available_functions)
+        control.start_call()
+        chunks: list[str] = []
+        token = _streamed.set(chunks)
+        try:
+            response = super().call(messages, tools, callbacks, available_functions)
+        except GenerationStopped:
+            response = "".join(chunks)
+        finally:
+            _streamed.reset(token)
+        control.check()
+        return response
+
+
+def _between_chunks(source, event: LLMStreamChunkEvent) -> None:
+    chunks = _streamed.get()
+    if chunks is None or not isinstance(source, LiteLLMBackend):
+        return
+    # registered after llm_cache's recorder and before the crew's stream
+    # handlers, so a stopped call's extra chunk never reaches the stream
+    if current_control().should_stop():
+        raise GenerationStopped()
+    chunks.append(event.chunk)
+
+
+crewai_event_bus.register_handler(LLMStreamChunkEvent, _between_chunks)
+
+
+class CachedLiteLLMBackend(CacheMixin, LiteLLMBackend):
+    """``LiteLLMBackend`` with a response cache."""
+
+
+class OllamaBackend(BaseLLM):
+    """
+    Streaming Ollama chat client sharing one connection pool per instance.
+
+    At most ``max_concurrency`` calls run at once; further callers wait for
+    a slot, which keeps a single local model from being oversubscribed by
+    parallel kickoffs. Chunks are emitted as ``LLMStreamChunkEvent`` like
+    crewai's own streaming. Under a ``CallControl`` a cancelled run closes
+    the HTTP response right away, which makes Ollama stop generating, and
+    ``stop_generation`` ends the call with the text received so far.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "http://localhost:11434",
+        keep_alive: Optional[str] = None,
+        max_concurrency: int = 2,
+        timeout: float = 300.0,
+        temperature: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        **options: Any,
+    ):
+        super().__init__(model=model, temperature=temperature)
+        self.stop = stop or []
+        # "ollama/qwen2.5:3b" is litellm's spelling; Ollama wants the bare name
+        self.ollama_model = model.split("/", 1)[1] if model.startswith(("ollama/", "ollama_chat/")) else model
+        self.keep_alive = keep_alive
+        self.options = options
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.client = httpx.Client(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=60.0,
+            ),
+        )
+
+    def _body(self, messages: List[Dict[str, str]]) -> dict:
+        options = dict(self.options)
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        if self.stop:
+            options["stop"] = self.stop
+        body = {
+            "model": self.ollama_model,
+            "messages": [{"role": m["role"], "content": m["content"]} for m in messages],
+            "stream": True,
+            "options": options,
+        }
+        if self.keep_alive is not None:
+            body["keep_alive"] = self.keep_alive
+        return body
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        control = current_control()
+        if control is not None:
+            control.start_call()
+        # wait for a slot in short slices so a cancelled run stops waiting
+        while not self._slots.acquire(timeout=0.1):
+            if control is not None:
+                control.check()
+        try:
+            return self._stream(messages, control)
+        finally:
+            self._slots.release()
+
+    def _stream(self, messages: List[Dict[str, str]], control) -> str:
+        parts: list[str] = []
+        with self.client.stream("POST", "/api/chat", json=self._body(messages)) as response:
+            response.raise_for_status()
+            abort = control.abort_with(response.close) if control is not None else contextlib.nullcontext()
+            try:
+                with abort:
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if "error" in event:
+                            raise RuntimeError(f"Ollama error: {event['error']}")
+                        chunk = event.get("message", {}).get("content", "")
+                        if chunk:
+                            parts.append(chunk)
+                            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=chunk))
+                        if control is not None and control.should_stop():
+                            break
+                        if event.get("done"):
+                            break
+            except httpx.HTTPError:
+                # reading a response closed by ``cancel`` fails; report the cancel
+                if control is not None:
+                    control.check()
+                raise
+        return "".join(parts)
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return int(self.options.get("num_ctx", 2048))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class CachedOllamaBackend(CacheMixin, OllamaBackend):
+    """``OllamaBackend`` with a response cache."""
+
+
+def llm_from_env(settings: dict):
+    """
+    Build the crew's LLM from ``settings`` (model, base_url, keep_alive, ...).
+
+    ``CREW_LLM_BACKEND`` picks ``litellm`` or ``ollama``,
+    ``CREW_LLM_CONCURRENCY`` caps the calls in flight on the ``ollama``
+    backend, and a configured response cache wraps either one.
+    """
+    backend = os.environ.get("CREW_LLM_BACKEND", "litellm")
+    cache = cache_from_env()
+    cache_kwargs = dict(cache=cache, mode=os.environ.get("CREW_LLM_CACHE_MODE", "readwrite"))
+    if backend == "litellm":
+        return CachedLiteLLMBackend(**settings, **cache_kwargs) if cache is not None else LiteLLMBackend(**settings)
+    if backend == "ollama":
+        kwargs = {k: v for k, v in settings.items() if k != "stream"}
+        kwargs["max_concurrency"] = int(os.environ.get("CREW_LLM_CONCURRENCY", "2"))
+        return CachedOllamaBackend(**kwargs, **cache_kwargs) if cache is not None else OllamaBackend(**kwargs)
+    raise ValueError(f"unknown LLM backend: {backend}")
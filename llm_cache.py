@@ -0,0 +1,187 @@
+"""Content-addressed on-disk cache of LLM responses with streaming replay."""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events import LLMStreamChunkEvent
+
+from streaming import current_control
+
+# chunks streamed by the LLM call running in the current context, if recording
+_recording: contextvars.ContextVar[Optional[list[str]]] = contextvars.ContextVar("llm_cache_recording", default=None)
+# best-of-N candidate whose calls run in the current context (0 outside of one)
+_candidate: contextvars.ContextVar[int] = contextvars.ContextVar("llm_cache_candidate", default=0)
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU store of streamed responses, one JSON file per key.
+
+    Reads refresh a file's mtime, and once the directory grows past
+    ``max_bytes`` the least recently used files are deleted.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.directory.glob("*.json"))
+
+    @staticmethod
+    def key(
+        model: str,
+        messages: Union[str, List[Dict[str, str]]],
+        stop: Optional[List[str]] = None,
+        candidate: int = 0,
+    ) -> str:
+        """Hash of the model, the fully interpolated prompt messages and the candidate."""
+        fields = {"model": model, "messages": messages, "stop": stop or []}
+        if candidate:
+            fields["candidate"] = candidate
+        payload = json.dumps(fields, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[list[str]]:
+        path = self.directory / f"{key}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)["chunks"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return chunks
+
+    def put(self, key: str, chunks: list[str]) -> None:
+        path = self.directory / f"{key}.json"
+        data = json.dumps({"chunks": chunks}).encode("utf-8")
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with self._lock:
+            old = path.stat().st_size if path.exists() else 0
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._size += len(data) - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            self._size -= size
+
+
+def _record_chunk(source, event: LLMStreamChunkEvent) -> None:
+    chunks = _recording.get()
+    if chunks is not None:
+        chunks.append(event.chunk)
+
+
+crewai_event_bus.register_handler(LLMStreamChunkEvent, _record_chunk)
+
+
+class CacheMixin:
+    """
+    Serve repeated prompts of an LLM class from a ``ResponseCache``.
+
+    Mixed in ahead of any crewai LLM implementation (see the ``Cached*``
+    classes in ``llm_backend``). On a hit the cached chunks are
+    re-emitted as ``LLMStreamChunkEvent`` so streaming consumers see the same
+    events as for a live call. With ``mode="replay"`` misses raise
+    ``CacheMiss`` instead of calling the model, which lets the crew run
+    without an Ollama server.
+    """
+
+    def __init__(self, *args, cache: ResponseCache, mode: str = "readwrite", **kwargs):
+        super().__init__(*args, **kwargs)
+        if mode not in ("readwrite", "replay"):
+            raise ValueError(f"unknown cache mode: {mode}")
+        self.cache = cache
+        self.cache_mode = mode
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        if tools:
+            # tool calls have side effects, never serve them from the cache
+            return super().call(messages, tools, callbacks, available_functions)
+
+        key = self.cache.key(self.model, messages, self.stop, _candidate.get())
+        chunks = self.cache.get(key)
+        if chunks is not None:
+            return self._replay(chunks)
+        if self.cache_mode == "replay":
+            raise CacheMiss(f"no cached response for {self.model} prompt {key[:12]}")
+
+        recorded: list[str] = []
+        token = _recording.set(recorded)
+        try:
+            response = super().call(messages, tools, callbacks, available_functions)
+        finally:
+            _recording.reset(token)
+        if isinstance(response, str) and response:
+            # keep the streamed chunking when it adds up to the final answer
+            self.cache.put(key, recorded if "".join(recorded) == response else [response])
+        return response
+
+    def _replay(self, chunks: list[str]) -> str:
+        """Re-emit cached chunks, honouring the stream's ``CallControl`` like a live call."""
+        control = current_control()
+        if control is not None:
+            control.start_call()
+        replayed: list[str] = []
+        for chunk in chunks:
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=chunk))
+            replayed.append(chunk)
+            if control is not None and control.should_stop():
+                break
+        return "".join(replayed)
+
+
+@contextmanager
+def candidate(index: int):
+    """
+    Cache the LLM calls made in this context under candidate ``index``.
+
+    Best-of-N candidates send identical prompts; keyed apart, each one gets
+    (and records) its own answer instead of all replaying the first.
+    """
+    token = _candidate.set(index)
+    try:
+        yield
+    finally:
+        _candidate.reset(token)
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """Build the cache configured by ``CREW_LLM_CACHE_DIR``, if any."""
+    directory = os.environ.get("CREW_LLM_CACHE_DIR")
+    if not directory:
+        return None
+    max_mb = int(os.environ.get("CREW_LLM_CACHE_MB", "256"))
+    return ResponseCache(directory, max_bytes=max_mb * 1024 * 1024)
@@ -0,0 +1,260 @@
+"""
+Minimal in-process metrics, rendered in the Prometheus text format.
+
+Only counters, gauges and histograms, each optionally labelled, which is all
+``/metrics`` needs; no dependency on ``prometheus_client``. Recording a value
+is a dict lookup and a few additions under a lock, cheap enough for every
+pass and parse. Per-token work is left to the callers, which only count
+chunks and time the first one (see ``PhaseTimer``).
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, or is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from ``function`` on every scrape instead."""
+        self._function = function
+
+    def _samples(self) -> list[str]:
+        value = self._function() if self._function is not None else self._value
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets, with their sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (last one is +Inf), sum]
+        self._series: Dict[LabelValues, list] = {}
+        if not labelnames:
+            self._series[()] = [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The metrics of this process, in registration order."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return REGISTRY.register(Gauge(name, help))
+
+
+def histogram(name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, buckets, labelnames))
+
+
+# The crew's metrics live here rather than in iterative_crew, so /metrics
+# lists them (at zero) before crewai has been imported.
+TIME_TO_FIRST_TOKEN = histogram(
+    "crew_time_to_first_token_seconds",
+    "Time from an agent starting its turn to its first streamed token.",
+    (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+    ("agent",),
+)
+TOKENS_PER_SECOND = histogram(
+    "crew_tokens_per_second",
+    "Streaming rate of an agent's turn after its first token.",
+    (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    ("agent",),
+)
+PHASE_SECONDS = histogram(
+    "crew_phase_duration_seconds",
+    "Duration of the analyst's and the manager's turn in a pass.",
+    (1, 2, 5, 10, 20, 30, 60, 120, 300, 600),
+    ("phase",),
+)
+PARSE_SECONDS = histogram(
+    "crew_json_parse_seconds",
+    "Time spent parsing LLM output, by the stage that produced the result.",
+    (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+    ("stage",),
+)
+PARSE_FAILURES = counter(
+    "crew_json_parse_failures_total",
+    "LLM outputs a parse stage could not handle (strict: needed repair; lenient: unparseable).",
+    ("stage",),
+)
+PROMPT_TOKENS = histogram(
+    "crew_prompt_tokens",
+    "Estimated prompt size of a refinement pass.",
+    (250, 500, 1000, 2000, 4000, 8000, 16000),
+)
+ITERATIONS = histogram(
+    "crew_iterations_per_run",
+    "Refinement passes a run went through.",
+    (1, 2, 3, 4, 5, 6, 8, 10),
+)
+STREAMS_ACTIVE = gauge("crew_streams_active", "Crew streams currently refining a slide.")
+KICKOFF_QUEUE_DEPTH = gauge("crew_kickoff_queue_depth", "Kickoffs waiting for a worker.")
+KICKOFFS_ACTIVE = gauge("crew_kickoffs_active", "Kickoffs currently running.")
+
+
+class PhaseTimer:
+    """
+    Times the agent turns of one pass.
+
+    ``start`` begins a turn (and ends the previous one), ``token`` is called
+    per streamed chunk and only reads the clock for the first, and ``end``
+    records the turn's duration and token rate.
+    """
+
+    def __init__(self):
+        self.agent: Optional[str] = None
+        self._started = 0.0
+        self._first: Optional[float] = None
+        self._tokens = 0
+
+    def start(self, agent: str) -> None:
+        self.end()
+        self.agent = agent
+        self._started = time.perf_counter()
+        self._first = None
+        self._tokens = 0
+
+    def token(self) -> None:
+        if self.agent is None:
+            return
+        self._tokens += 1
+        if self._first is None:
+            self._first = time.perf_counter()
+            TIME_TO_FIRST_TOKEN.observe(self._first - self._started, agent=self.agent)
+
+    def end(self) -> None:
+        if self.agent is None:
+            return
+        now = time.perf_counter()
+        PHASE_SECONDS.observe(now - self._started, phase=self.agent)
+        if self._first is not None and self._tokens > 1 and now > self._first:
+            TOKENS_PER_SECOND.observe((self._tokens - 1) / (now - self._first), agent=self.agent)
+        self.agent = None
@@ -0,0 +1,144 @@
+"""
+Where ``/start`` parks a prompt until its ``/stream`` request picks it up.
+
+Both stores expire prompts after ``ttl`` seconds and hold at most
+``max_size`` of them, dropping the oldest first, so abandoned ``/start``
+calls cannot grow memory without bound. ``MemoryPromptStore`` is private to
+one worker; ``SQLitePromptStore`` keeps prompts in a file every uvicorn
+worker on the host can open, so a stream may land on any worker.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class MemoryPromptStore:
+    """Per-process prompt store with TTL and size bounds."""
+
+    def __init__(self, ttl: float = 300.0, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        # insertion order is expiry order, since every entry gets the same ttl
+        self._prompts: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, pid: str, prompt: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._prompts[pid] = (now + self.ttl, prompt)
+            self._prompts.move_to_end(pid)
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired prompts and any beyond ``max_size``, oldest first."""
+        while self._prompts:
+            oldest, (expires, _) = next(iter(self._prompts.items()))
+            if expires > now and len(self._prompts) <= self.max_size:
+                break
+            del self._prompts[oldest]
+
+    def pop(self, pid: str) -> Optional[str]:
+        """Remove and return the prompt, or ``None`` if unknown or expired."""
+        with self._lock:
+            entry = self._prompts.pop(pid, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def __contains__(self, pid: str) -> bool:
+        entry = self._prompts.get(pid)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        """Prompts that have not expired, like ``SQLitePromptStore``."""
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._prompts)
+
+
+class SQLitePromptStore:
+    """
+    Prompt store in a SQLite file shared by all workers on one host.
+
+    ``pop`` deletes inside a write transaction, so when two workers race for
+    the same id exactly one of them gets the prompt.
+    """
+
+    def __init__(self, path: str, ttl: float = 300.0, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS prompts (id TEXT PRIMARY KEY, prompt TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS prompts_expires ON prompts (expires)")
+
+    def put(self, pid: str, prompt: str) -> None:
+        # wall-clock time, since the expiry is compared across processes
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM prompts WHERE expires <= ?", (now,))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO prompts (id, prompt, expires) VALUES (?, ?, ?)",
+                    (pid, prompt, now + self.ttl),
+                )
+                self._db.execute(
+                    "DELETE FROM prompts WHERE id IN (SELECT id FROM prompts ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def pop(self, pid: str) -> Optional[str]:
+        """Remove and return the prompt, or ``None`` if unknown or expired."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT prompt, expires FROM prompts WHERE id = ?", (pid,)).fetchone()
+                if row is not None:
+                    self._db.execute("DELETE FROM prompts WHERE id = ?", (pid,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
+
+    def __contains__(self, pid: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM prompts WHERE id = ? AND expires > ?", (pid, time.time())
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM prompts WHERE expires > ?", (time.time(),)).fetchone()[0]
+
+
+def prompt_store_from_env():
+    """
+    Build the store selected by ``PROMPT_STORE`` (``memory`` or ``sqlite``).
+
+    ``PROMPT_STORE_PATH`` is the SQLite file, ``PROMPT_TTL`` the seconds a
+    prompt waits for its stream and ``PROMPT_MAX`` the number of prompts kept.
+    """
+    ttl = float(os.environ.get("PROMPT_TTL", "300"))
+    max_size = int(os.environ.get("PROMPT_MAX", "10000"))
+    kind = os.environ.get("PROMPT_STORE", "memory")
+    if kind == "memory":
+        return MemoryPromptStore(ttl=ttl, max_size=max_size)
+    if kind == "sqlite":
+        return SQLitePromptStore(os.environ.get("PROMPT_STORE_PATH", "prompts.sqlite3"), ttl=ttl, max_size=max_size)
+    raise ValueError(f"unknown prompt store: {kind}")
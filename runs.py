@@ -0,0 +1,246 @@
+"""
+Crew runs that outlive the HTTP connection streaming them.
+
+A run pumps its event source into a bounded ring buffer of numbered events.
+Connections only read from that buffer, so a client that reconnects with the
+number of the last event it saw carries on from there instead of starting
+the crew again, and any number of readers can follow one run: each is just a
+cursor into the shared buffer, and the producer never waits for any of them.
+"""
+
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Optional, Tuple
+
+
+class Run:
+    """Numbered events of one run, keeping the last ``buffer_size`` of them."""
+
+    def __init__(self, run_id: str, buffer_size: int = 4096):
+        self.id = run_id
+        self.done = False
+        self.cancelled = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        # called whenever the last reader leaves an unfinished run
+        self.on_idle: Optional[Callable[["Run"], None]] = None
+        self._events: deque = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def last_id(self) -> int:
+        return self._seq
+
+    async def append(self, item: Any) -> int:
+        """Add ``item`` as the next event and wake up the readers."""
+        self._seq += 1
+        self._events.append((self._seq, item))
+        async with self._changed:
+            self._changed.notify_all()
+        return self._seq
+
+    async def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        async with self._changed:
+            self._changed.notify_all()
+
+    def events_after(self, seq: int) -> list[Tuple[int, Any]]:
+        """Buffered events numbered above ``seq``; the oldest ones may be gone."""
+        if not self._events:
+            return []
+        start = max(0, seq - self._events[0][0] + 1)
+        return list(islice(self._events, start, None))
+
+    async def batches(
+        self, after: int = 0, max_lag: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, list[Tuple[int, Any]]]]:
+        """
+        Yield ``(dropped, events)`` with everything new after ``after``, live until the run ends.
+
+        A reader that fell behind gets its whole backlog as one batch, so it
+        catches up in one write instead of one per event. With ``max_lag``
+        only the newest ``max_lag`` pending events are kept; ``dropped``
+        counts the events skipped, including any the ring buffer evicted.
+        """
+        last = after
+        self.subscribers += 1
+        try:
+            while True:
+                events = self.events_after(last)
+                if events:
+                    dropped = events[0][0] - last - 1
+                    if max_lag is not None and len(events) > max_lag:
+                        dropped += len(events) - max_lag
+                        events = events[-max_lag:]
+                    last = events[-1][0]
+                    yield dropped, events
+                    continue
+                if self.done and last >= self._seq:
+                    return
+                async with self._changed:
+                    await self._changed.wait_for(lambda: self._seq > last or self.done)
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.done and self.on_idle is not None:
+                self.on_idle(self)
+
+    async def follow(self, after: int = 0) -> AsyncIterator[Tuple[int, Any]]:
+        """Yield ``(id, item)`` for events after ``after``, live until the run ends."""
+        batches = self.batches(after)
+        try:
+            async for _, events in batches:
+                for event in events:
+                    yield event
+        finally:
+            await batches.aclose()
+
+
+class RunRegistry:
+    """
+    Runs of this worker by id.
+
+    ``start`` drives a source in a background task, independent of the
+    connections reading it. A run with no readers ``cancel_grace`` seconds
+    after it started, or after its last reader left, is cancelled, which
+    closes its source and with it the crew's kickoff; the grace period covers
+    an ``EventSource`` reconnecting after a network blip. Finished runs stay
+    available for ``retention`` seconds so late reconnects can still read
+    their tail.
+    """
+
+    def __init__(self, buffer_size: int = 4096, retention: float = 60.0, cancel_grace: float = 1.0):
+        self.buffer_size = buffer_size
+        self.retention = retention
+        self.cancel_grace = cancel_grace
+        self._runs: dict[str, Run] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def get(self, run_id: str) -> Optional[Run]:
+        return self._runs.get(run_id)
+
+    def start(self, run_id: str, source: AsyncIterator[Any]) -> Run:
+        run = self._runs[run_id] = Run(run_id, self.buffer_size)
+        run.on_idle = self._idle
+        self._tasks[run_id] = asyncio.create_task(self._pump(run, source))
+        # the client that started it may be gone before it reads a frame
+        self._idle(run)
+        return run
+
+    def cancel(self, run_id: str) -> bool:
+        """Cancel a running run; ``False`` if it is unknown or already over."""
+        task = self._tasks.get(run_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def _idle(self, run: Run) -> None:
+        asyncio.get_running_loop().call_later(self.cancel_grace, self._cancel_if_idle, run)
+
+    def _cancel_if_idle(self, run: Run) -> None:
+        if not run.subscribers and not run.done:
+            print(f"Run {run.id} has no readers; cancelling it.")
+            self.cancel(run.id)
+
+    async def _pump(self, run: Run, source: AsyncIterator[Any]) -> None:
+        error = None
+        try:
+            async for item in source:
+                await run.append(item)
+        except asyncio.CancelledError:
+            run.cancelled = True
+        except Exception as e:
+            print(f"Run {run.id} failed: {e}")
+            error = e
+        finally:
+            if run.cancelled:
+                # close the source now, which cancels the crew's kickoff
+                await source.aclose()
+            await run.finish(error)
+            self._tasks.pop(run.id, None)
+            asyncio.get_running_loop().call_later(self.retention, self._forget, run)
+
+    def _forget(self, run: Run) -> None:
+        if self._runs.get(run.id) is run:
+            del self._runs[run.id]
+
+    @property
+    def active(self) -> int:
+        """Runs still producing events."""
+        return len(self._tasks)
+
+    @property
+    def readers(self) -> int:
+        """Connections currently following a run."""
+        return sum(run.subscribers for run in self._runs.values())
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+
+def prompt_key(prompt: str) -> str:
+    """Hash of ``prompt`` ignoring case and whitespace differences."""
+    normalized = " ".join(prompt.split()).casefold()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Point identical prompts at the run already working on them.
+
+    A claim is live while its prompt still waits in ``prompts`` for the
+    first stream, while ``/stream`` is starting its run (ids in ``starting``)
+    and while its run is in progress. Otherwise an id the registry does not
+    know is a dead run, so a claim never outlives its run. Finished or
+    cancelled runs are never joined either, so a later identical prompt gets
+    a fresh refinement.
+    """
+
+    def __init__(self, runs: RunRegistry, prompts, starting=()):
+        self.runs = runs
+        self.prompts = prompts
+        self.starting = starting
+        # prompt key -> run id, oldest claim first
+        self._claims: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _alive(self, run_id: str) -> bool:
+        # checked in the order an id moves through them, so a run that is
+        # started between two of the checks is still found by the next one
+        if run_id in self.prompts or run_id in self.starting:
+            return True
+        run = self.runs.get(run_id)
+        return run is not None and not run.done
+
+    def find(self, prompt: str) -> Optional[str]:
+        """Id of the pending or running run for an identical prompt, if any."""
+        key = prompt_key(prompt)
+        with self._lock:
+            run_id = self._claims.get(key)
+            if run_id is None:
+                return None
+            if not self._alive(run_id):
+                del self._claims[key]
+                return None
+            return run_id
+
+    def claim(self, prompt: str, run_id: str) -> None:
+        """Record ``run_id`` as the run for ``prompt``."""
+        key = prompt_key(prompt)
+        with self._lock:
+            self._claims[key] = run_id
+            self._claims.move_to_end(key)
+            # drop dead claims from the front so the map stays bounded
+            while self._claims:
+                oldest, claimed = next(iter(self._claims.items()))
+                if self._alive(claimed):
+                    break
+                del self._claims[oldest]
+
+    def __len__(self) -> int:
+        return len(self._claims)
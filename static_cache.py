@@ -0,0 +1,125 @@
+"""In-memory cache of the UI's static files, precompressed and served with ETags."""
+
+import gzip
+import hashlib
+import mimetypes
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except Exception:  # pragma: no cover - optional, gzip is used without it
+    brotli = None
+
+# content types worth compressing; images and fonts are already compressed
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+class StaticAsset:
+    """One file's bytes in every encoding we serve, read and compressed once."""
+
+    def __init__(self, path: Path):
+        stat = path.stat()
+        self.path = path
+        self.mtime = stat.st_mtime_ns
+        self.size = stat.st_size
+        body = path.read_bytes()
+        self.content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/"):
+            self.content_type += "; charset=utf-8"
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # a strong ETag identifies exact bytes, so each encoding gets its own
+        self.encodings: dict[str, tuple[bytes, str]] = {"identity": (body, f'"{digest}"')}
+        if self.content_type.startswith(_COMPRESSIBLE):
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.encodings["gzip"] = (gz, f'"{digest}-gzip"')
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.encodings["br"] = (br, f'"{digest}-br"')
+
+    def pick(self, accept_encoding: str) -> str:
+        """Best encoding the client accepts, preferring brotli over gzip."""
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def matches(self, if_none_match: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return any(etag in tags for _, etag in self.encodings.values())
+
+
+class StaticCache:
+    """
+    Serve files below ``directory`` from memory.
+
+    Files are loaded on first request and re-read only when their mtime or
+    size changes; the check is a ``stat`` at most every ``check_interval``
+    seconds per file. Entries are keyed by the file's real path, so the
+    cache holds at most one entry per file however a URL spells it.
+    """
+
+    def __init__(self, directory: str, check_interval: float = 1.0):
+        self.directory = Path(directory).resolve()
+        self.check_interval = check_interval
+        self._assets: dict[str, StaticAsset] = {}
+        self._checked: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, relpath: str) -> Optional[StaticAsset]:
+        """The cached asset for ``relpath``, or ``None`` if no such file exists."""
+        path = (self.directory / relpath).resolve()
+        if not path.is_relative_to(self.directory):
+            return None
+        # every alias of a file (``./a``, ``x/../a``) shares the entry of its real path
+        key = path.relative_to(self.directory).as_posix()
+        asset = self._assets.get(key)
+        now = time.monotonic()
+        if asset is not None and now - self._checked.get(key, 0.0) < self.check_interval:
+            return asset
+
+        if not path.is_file():
+            with self._lock:
+                self._assets.pop(key, None)
+                self._checked.pop(key, None)
+            return None
+        stat = path.stat()
+        with self._lock:
+            asset = self._assets.get(key)
+            if asset is None or asset.mtime != stat.st_mtime_ns or asset.size != stat.st_size:
+                asset = self._assets[key] = StaticAsset(path)
+            self._checked[key] = now
+        return asset
+
+    def response(self, request: Request, relpath: str, cache_control: str) -> Response:
+        """``200`` with the best encoding, ``304`` if the client's copy is current, else ``404``."""
+        try:
+            asset = self.get(relpath)
+        except (OSError, ValueError):
+            # ValueError: a path the OS cannot represent, e.g. with a NUL byte
+            asset = None
+        if asset is None:
+            return Response(status_code=404)
+
+        encoding = asset.pick(request.headers.get("accept-encoding", ""))
+        body, etag = asset.encodings[encoding]
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if asset.matches(request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(media_type=asset.content_type, headers=headers)
+        return Response(body, media_type=asset.content_type, headers=headers)
+
@@ -0,0 +1,235 @@
+"""Plumbing for moving streamed tokens from crew threads to HTTP clients."""
+
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Optional, Tuple
+
+
+class RunCancelled(BaseException):
+    """
+    Raised inside a kickoff thread once its stream has been cancelled.
+
+    A ``BaseException`` like ``asyncio.CancelledError``, so crewai's
+    retry-on-error handling lets it through and the kickoff ends at once.
+    """
+
+
+class GenerationStopped(BaseException):
+    """
+    Raised between chunks to end an LLM call early (see ``llm_backend``).
+
+    The backend catches it and returns the text streamed so far. A
+    ``BaseException`` so crewai's event bus and streaming loop let it through.
+    """
+
+
+class CallControl:
+    """
+    Signals from a stream to the LLM calls of its kickoff thread.
+
+    crewai's event bus swallows handler exceptions, so a chunk handler cannot
+    stop a generation by raising; it sets a flag here instead, which the LLM
+    backend checks between chunks (see ``llm_backend``). Every call starts
+    with ``start_call``, so a stop meant for one call never carries over to
+    the next.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        # end the current LLM call early and keep the text streamed so far
+        self.stop_generation = False
+        self._aborts: list = []
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        """Cancel the run; safe to call from any thread, more than once."""
+        self.cancelled.set()
+        with self._lock:
+            aborts = list(self._aborts)
+        for abort in aborts:
+            try:
+                abort()
+            except Exception:
+                pass
+
+    def check(self) -> None:
+        if self.cancelled.is_set():
+            raise RunCancelled()
+
+    def start_call(self) -> None:
+        """Begin an LLM call: raise if cancelled and forget any earlier stop."""
+        self.check()
+        self.stop_generation = False
+
+    def should_stop(self) -> bool:
+        """Between chunks: raise if cancelled, else consume a pending stop."""
+        self.check()
+        if self.stop_generation:
+            self.stop_generation = False
+            return True
+        return False
+
+    @contextmanager
+    def abort_with(self, abort):
+        """Call ``abort`` (e.g. close an HTTP response) if cancelled meanwhile."""
+        with self._lock:
+            self._aborts.append(abort)
+        try:
+            # cancelled before the abort hook was in place
+            self.check()
+            yield
+        finally:
+            with self._lock:
+                self._aborts.remove(abort)
+
+
+_control: contextvars.ContextVar[Optional[CallControl]] = contextvars.ContextVar("call_control", default=None)
+
+
+@contextmanager
+def controlled(control: CallControl):
+    """Apply ``control`` to every LLM call made in this context."""
+    token = _control.set(control)
+    try:
+        yield control
+    finally:
+        _control.reset(token)
+
+
+def current_control() -> Optional[CallControl]:
+    return _control.get()
+
+
+class TokenBridge:
+    """
+    Hand items from worker threads to an asyncio consumer without polling.
+
+    ``put`` may be called from any thread: it schedules the item onto the
+    event loop with ``loop.call_soon_threadsafe`` and blocks once ``maxsize``
+    items are waiting, so a slow consumer throttles the producing kickoff
+    thread instead of letting the backlog grow. ``close`` ends the consumer's
+    ``async for`` once everything already queued has been read.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 1024):
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._slots = threading.Semaphore(maxsize)
+        self._abandoned = False
+
+    def put(self, item: Any) -> bool:
+        """Queue ``item`` for the consumer; return ``False`` if it has gone away."""
+        # wait in short slices so producers notice an abandoned consumer
+        while not self._slots.acquire(timeout=0.1):
+            if self._abandoned:
+                return False
+        if self._abandoned:
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            # event loop already closed
+            self._abandoned = True
+            return False
+        return True
+
+    def close(self) -> None:
+        """Signal the end of the stream. Safe to call from any thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, self._CLOSED)
+        except RuntimeError:
+            pass
+
+    def abandon(self) -> None:
+        """Called by the consumer when it stops reading; unblocks producers."""
+        self._abandoned = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        item = await self._queue.get()
+        if item is self._CLOSED:
+            raise StopAsyncIteration
+        self._slots.release()
+        return item
+
+
+async def coalesce_tokens(
+    source: AsyncIterator[Tuple[str, str, int]],
+    interval: float = 0.016,
+    max_chars: int = 2048,
+    passthrough: Tuple[str, ...] = ("draft", "draft_partial"),
+) -> AsyncIterator[Tuple[str, str, int]]:
+    """
+    Merge consecutive ``(agent, token, run)`` items into larger batches.
+
+    Tokens from the same agent and run are joined until ``max_chars`` is
+    reached or ``interval`` seconds have passed since the first one, which
+    turns a token-per-frame stream into a few frames per second per agent.
+    Agents listed in ``passthrough`` carry whole JSON documents and are
+    never merged. ``interval <= 0`` disables coalescing.
+    """
+    if interval <= 0:
+        async for item in source:
+            yield item
+        return
+
+    loop = asyncio.get_running_loop()
+    pending: asyncio.Queue = asyncio.Queue(maxsize=256)
+    done = object()
+    failure: list[BaseException] = []
+
+    async def pump() -> None:
+        try:
+            async for item in source:
+                await pending.put(item)
+        except Exception as e:
+            failure.append(e)
+        await pending.put(done)
+
+    task = asyncio.create_task(pump())
+    key: Optional[Tuple[str, int]] = None
+    parts: list[str] = []
+    size = 0
+    deadline = 0.0
+    try:
+        while True:
+            if parts:
+                try:
+                    item = await asyncio.wait_for(pending.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    yield key[0], "".join(parts), key[1]
+                    parts, size = [], 0
+                    continue
+            else:
+                item = await pending.get()
+            if item is done:
+                break
+
+            agent, token, run = item
+            if parts and (agent in passthrough or (agent, run) != key):
+                yield key[0], "".join(parts), key[1]
+                parts, size = [], 0
+            if agent in passthrough:
+                yield item
+                continue
+            if not parts:
+                key = (agent, run)
+                deadline = loop.time() + interval
+            parts.append(token)
+            size += len(token)
+            if size >= max_chars:
+                yield key[0], "".join(parts), key[1]
+                parts, size = [], 0
+
+        if parts:
+            yield key[0], "".join(parts), key[1]
+        if failure:
+            raise failure[0]
+    finally:
+        task.cancel()
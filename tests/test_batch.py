@@ -0,0 +1,49 @@
+import json
+
+from batch import completed_ids, run_batch
+from benchmarks.stub_llm import StubLLM
+
+
+def test_completed_ids_ignores_lines_that_are_not_checkpoints(tmp_path):
+    out = tmp_path / "slides.jsonl"
+    out.write_text('null\n[1, 2]\n"a"\n{"slide": {}}\n{"id": 7, "slide": {}}\n{"id": "b", "sl', encoding="utf-8")
+    assert completed_ids(str(out)) == {"7"}
+
+
+def test_skipped_counts_only_items_of_this_input(tmp_path):
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text(
+        "\n".join(json.dumps({"id": i, "research": f"Notes MARK-{i}{i}"}) for i in ("a", "b")) + "\n", encoding="utf-8"
+    )
+    out = tmp_path / "slides.jsonl"
+    # "a" is done; "old" and "older" come from another input file
+    out.write_text("".join(json.dumps({"id": i, "slide": {}}) + "\n" for i in ("a", "old", "older")), encoding="utf-8")
+
+    summary = run_batch(str(prompts), str(out), concurrency=1, max_iters=1, llm=StubLLM(delay=0))
+    assert summary == {"done": 1, "skipped": 1, "failed": 0}
+
+
+def test_bad_lines_fail_alone_and_duplicate_ids_run_once(tmp_path, capsys):
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text(
+        "\n".join(
+            [
+                json.dumps({"id": "a", "research": "Notes MARK-aa"}),
+                '{"id": "torn", "resea',
+                json.dumps({"id": "no-research"}),
+                "null",
+                json.dumps({"id": "a", "research": "Notes MARK-aa again"}),
+                json.dumps({"id": "b", "research": "Notes MARK-bb"}),
+            ]
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    out = tmp_path / "slides.jsonl"
+    llm = StubLLM(delay=0)
+
+    summary = run_batch(str(prompts), str(out), concurrency=1, max_iters=1, llm=llm)
+    assert summary == {"done": 2, "skipped": 0, "failed": 3}
+    assert sorted(json.loads(line)["id"] for line in out.read_text().splitlines()) == ["a", "b"]
+    printed = capsys.readouterr().out
+    assert "[line 2] failed" in printed and "[no-research] failed" in printed and "[line 4] failed" in printed
@@ -0,0 +1,44 @@
+import json
+
+from benchmarks.stub_llm import StubLLM
+from iterative_crew import build_crew
+from llm_cache import CacheMixin, ResponseCache
+
+
+class RatingStub(StubLLM):
+    """Rate each review one higher than the last, like a sampled model would differ."""
+
+    def __init__(self):
+        super().__init__(delay=0)
+        self.reviews = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        answer = super().call(messages, tools, callbacks, available_functions)
+        if '"rating"' not in answer:
+            return answer
+        self.reviews += 1
+        head, payload = answer.split("Final Answer: ", 1)
+        review = json.loads(payload)
+        review["rating"] = self.reviews
+        return head + "Final Answer: " + json.dumps(review)
+
+
+class CachedRatingStub(CacheMixin, RatingStub):
+    pass
+
+
+def test_best_of_candidates_do_not_share_cached_answers(tmp_path):
+    llm = CachedRatingStub(cache=ResponseCache(tmp_path))
+    crew = build_crew(llm)
+    crew._start_refinement()
+    inputs = crew._pass_inputs("Research notes MARK-abc")
+
+    # one at a time, so a shared key would serve candidates 2 and 3 from the cache
+    _, review = crew._best_of(inputs, candidates=3, concurrency=1)
+    assert llm.calls == 6
+    assert review["rating"] == 3
+
+    # the same best-of again replays each candidate's own answer
+    _, review = crew._best_of(inputs, candidates=3, concurrency=1)
+    assert llm.calls == 6
+    assert review["rating"] == 3
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.load_test import start_fake_server
+from llm_backend import CachedLiteLLMBackend, LiteLLMBackend
+from llm_cache import ResponseCache
+from streaming import CallControl, RunCancelled, controlled
+
+
+def test_stop_during_cache_replay_does_not_cut_the_next_call(tmp_path):
+    cache = ResponseCache(tmp_path)
+    llm = CachedLiteLLMBackend(model="ollama/fake", cache=cache, mode="replay")
+    draft = [{"role": "user", "content": "draft"}]
+    review = [{"role": "user", "content": "review"}]
+    cache.put(cache.key(llm.model, draft, llm.stop), ["{", '"title": "t"', "}", " trailing prose"])
+    cache.put(cache.key(llm.model, review, llm.stop), ["{", '"rating": 4', "}"])
+
+    control = CallControl()
+    seen: list[str] = []
+
+    def on_chunk(source, event):
+        if source is llm:
+            seen.append(event.chunk)
+            # like the speculative review once the draft is complete
+            if event.chunk == "}" and len(seen) == 3:
+                control.stop_generation = True
+
+    crewai_event_bus.register_handler(LLMStreamChunkEvent, on_chunk)
+    with controlled(control):
+        assert llm.call(draft) == '{"title": "t"}'
+        assert llm.call(review) == '{"rating": 4}'
+    assert not control.stop_generation
+
+
+def test_start_call_forgets_a_stale_stop():
+    control = CallControl()
+    control.stop_generation = True
+    control.start_call()
+    assert not control.should_stop()
+
+
+def test_cancel_stops_a_litellm_stream_mid_generation():
+    fake = FakeOllama(first_token_delay=0.05, chunk_delay=0.1, trailer="word " * 300)
+    llm = LiteLLMBackend(model="ollama/fake", base_url=start_fake_server(fake), stream=True)
+    control = CallControl()
+    outcome = {}
+
+    def call():
+        with controlled(control):
+            with pytest.raises(RunCancelled):
+                llm.call([{"role": "user", "content": "slide MARK-abc"}])
+            outcome["at"] = time.perf_counter()
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    time.sleep(1.0)
+    cancelled_at = time.perf_counter()
+    control.cancel()
+    thread.join(5)
+    # the whole answer takes over 30 s; the call ends at the next chunk
+    assert outcome["at"] - cancelled_at < 1.0
+    deadline = time.monotonic() + 2
+    while fake.active and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert fake.active == 0
@@ -0,0 +1,45 @@
+import copy
+
+from iterative_crew import has_converged
+
+DRAFT = {
+    "title": "Resource Provinces Led Canada's 2022 Growth as Oil and Potash Prices Surged",
+    "subtitle": "Saskatchewan and Alberta outpaced the national 3.4% rebound",
+    "sections": [
+        {
+            "section_title": f"Driver {i}",
+            "section_bullets": [
+                f"**Bullet {i}.{j}** moved the provincial output by {i + j} points in 2022" for j in range(4)
+            ],
+        }
+        for i in range(4)
+    ],
+}
+REVIEW = {
+    "rating": 3,
+    "comments": [
+        {"element": "Driver 1", "comment": "Name the commodity behind this driver."},
+        {"element": "Bullet 2.3", "comment": "Quote the source of the figure."},
+    ],
+    "summary": "Close.",
+}
+
+
+def test_a_one_word_edit_converges():
+    edited = copy.deepcopy(DRAFT)
+    bullets = edited["sections"][2]["section_bullets"]
+    bullets[1] = bullets[1].replace("moved", "shifted")
+    assert has_converged(DRAFT, edited, REVIEW, copy.deepcopy(REVIEW), 0.02)
+
+
+def test_a_rewrite_does_not_converge():
+    rewritten = copy.deepcopy(DRAFT)
+    rewritten["sections"][1]["section_bullets"] = ["**Potash exports doubled** as sanctions cut supply from Belarus"]
+    rewritten["title"] = "Commodity Prices, Not Population, Explain the Provincial Growth Gap"
+    assert not has_converged(DRAFT, rewritten, REVIEW, REVIEW, 0.02)
+
+
+def test_new_review_comments_do_not_converge():
+    review = copy.deepcopy(REVIEW)
+    review["comments"][1] = {"element": "title", "comment": "Lead with the 5.7% figure instead."}
+    assert not has_converged(DRAFT, DRAFT, REVIEW, review, 0.02)
@@ -0,0 +1,49 @@
+import json
+
+from iterative_crew import build_crew, estimate_tokens
+
+
+def _review(*comments):
+    return {"rating": 2, "comments": [{"element": e, "comment": c} for e, c in comments]}
+
+
+def test_oversized_first_comment_is_shortened_not_dropped():
+    crew = build_crew()
+    crew._start_refinement()
+    section = json.dumps({"section_title": "Growth", "section_bullets": ["x" * 400] * 6})
+    feedback = crew._build_feedback(
+        _review(
+            (section, "Cut this section to three bullets."),
+            ("title", "Make the title a takeaway."),
+            ("subtitle", "Name the time period."),
+        )
+    )
+    lines = feedback.splitlines()
+    assert lines[0].endswith("…: Cut this section to three bullets.")
+    assert "title: Make the title a takeaway." in lines
+    assert estimate_tokens(feedback) <= crew.feedback_token_budget + len(lines)
+
+
+def test_lines_past_the_budget_are_counted_as_omitted():
+    crew = build_crew()
+    crew._start_refinement()
+    crew.feedback_token_budget = 40
+    feedback = crew._build_feedback(
+        _review(*[(f"sections[{i}].section_title", "Shorten this title a lot please.") for i in range(6)])
+    )
+    lines = feedback.splitlines()
+    assert lines[0] == "sections[0].section_title: Shorten this title a lot please."
+    assert lines[-1].startswith("(+") and lines[-1].endswith("more comments omitted)")
+
+
+def test_repeated_comments_keep_their_text():
+    crew = build_crew()
+    crew._start_refinement()
+    section = json.dumps({"section_title": "Growth", "section_bullets": ["x" * 200] * 3})
+    review = _review((section, "Cut this section to three bullets."), ("title", "Make the title a takeaway."))
+    first = crew._build_feedback(review)
+    again = crew._build_feedback(review)
+
+    assert "Still open: title: Make the title a takeaway." in again.splitlines()
+    assert "Cut this section to three bullets." in again
+    assert estimate_tokens(again) < estimate_tokens(first)
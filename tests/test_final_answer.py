@@ -0,0 +1,28 @@
+import json
+
+from iterative_crew import FinalAnswerParser, final_answer
+from lenient_json import is_slide_milestone
+
+OLD = {"title": "Old", "subtitle": "S", "sections": [{"section_title": "A", "section_bullets": ["b"]}]}
+NEW = {"title": "New", "subtitle": "S", "sections": [{"section_title": "A", "section_bullets": ["c"]}]}
+ANSWER = (
+    f"Thought: the current plan is {json.dumps(OLD)} and the title needs work.\n"
+    f"Final Answer: {json.dumps(NEW)}\n\nI hope this helps."
+)
+
+
+def test_a_draft_quoted_in_the_thought_is_ignored():
+    for size in (1, 3, 7, 64):
+        parser = FinalAnswerParser(watch=is_slide_milestone)
+        marker = ANSWER.index("Final Answer:")
+        for i in range(0, len(ANSWER), size):
+            parser.feed(ANSWER[i : i + size])
+            if i + size <= marker:
+                assert not parser.complete and parser.document is None
+        assert parser.complete
+        assert parser.document == NEW
+
+
+def test_final_answer_falls_back_to_the_whole_text():
+    assert json.loads(final_answer(ANSWER).split("\n\n")[0]) == NEW
+    assert final_answer('{"a": 1}') == '{"a": 1}'
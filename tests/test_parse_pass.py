@@ -0,0 +1,44 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from iterative_crew import build_crew
+
+GOOD = {"title": "T", "subtitle": "S", "sections": [{"section_title": "A", "section_bullets": ["b"]}]}
+REVIEW = {"rating": 4, "comments": [{"element": "title", "comment": "Lead with the number."}], "summary": "Good."}
+
+
+def _out(draft: str, review: str):
+    return SimpleNamespace(tasks_output=[SimpleNamespace(raw=draft, pydantic=None), SimpleNamespace(raw=review)])
+
+
+@pytest.mark.parametrize(
+    "blob",
+    [
+        "Sorry, I cannot help with {that}",
+        # cut off before the first section's bullets
+        '{"title": "T", "subtitle": "S", "sections": [{"section_title": "A", "sect',
+    ],
+)
+def test_unusable_drafts_are_rejected(blob):
+    with pytest.raises(ValueError):
+        build_crew()._parse_draft(blob)
+
+
+def test_a_failed_pass_keeps_the_previous_draft():
+    crew = build_crew()
+    crew.draft = GOOD
+    draft, review = crew._parse_pass(_out("Sorry, I cannot help with {that}", "{}"))
+    assert draft is GOOD
+    assert review["rating"] == 0
+
+    with pytest.raises(ValueError):
+        crew._parse_pass(_out("{}", json.dumps(REVIEW)), strict=True)
+
+
+def test_a_good_pass_is_parsed():
+    crew = build_crew()
+    draft, review = crew._parse_pass(_out(json.dumps(GOOD), json.dumps(REVIEW)))
+    assert draft == GOOD
+    assert review["rating"] == 4 and review["comments"][0]["element"] == "T"
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from prompt_store import MemoryPromptStore
+from runs import RunRegistry, SingleFlight
+
+
+async def _events():
+    yield "a"
+    yield "b"
+
+
+def test_single_flight_forgets_a_run_once_it_is_gone():
+    async def scenario():
+        prompts = MemoryPromptStore(ttl=300)
+        runs = RunRegistry(retention=0.01)
+        single = SingleFlight(runs, prompts)
+
+        prompts.put("r1", "Hello  World")
+        single.claim("Hello  World", "r1")
+        assert single.find(" hello world ") == "r1"
+
+        # /stream takes the prompt and starts the run
+        prompts.pop("r1")
+        run = runs.start("r1", _events())
+        assert single.find("hello world") == "r1"
+
+        async for _ in run.follow():
+            pass
+
+        # retention over: the registry no longer knows the id, and the
+        # prompt's ttl has not expired yet
+        await asyncio.sleep(0.05)
+        assert runs.get("r1") is None
+        assert single.find("hello world") is None
+        assert len(single) == 0
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_ignores_an_expired_prompt():
+    prompts = MemoryPromptStore(ttl=0)
+    single = SingleFlight(RunRegistry(), prompts)
+    prompts.put("r1", "brief")
+    single.claim("brief", "r1")
+    assert single.find("brief") is None
+
+
+def test_single_flight_keeps_a_run_that_is_being_started():
+    prompts = MemoryPromptStore(ttl=300)
+    starting: dict = {}
+    single = SingleFlight(RunRegistry(), prompts, starting)
+    prompts.put("r1", "brief")
+    single.claim("brief", "r1")
+
+    # /stream has taken the prompt but not registered the run yet
+    starting["r1"] = object()
+    prompts.pop("r1")
+    assert single.find("brief") == "r1"
+
+
+def test_a_run_that_is_never_read_is_cancelled():
+    async def slow():
+        while True:
+            yield "token"
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        runs = RunRegistry(cancel_grace=0.05)
+        unread = runs.start("r1", slow())
+        read = runs.start("r2", slow())
+        follower = read.follow()
+        await follower.__anext__()
+        await asyncio.sleep(0.2)
+        assert unread.cancelled and unread.done
+        assert not read.done
+        await follower.aclose()
+        await asyncio.sleep(0.2)
+        assert read.cancelled
+
+    asyncio.run(scenario())
+
+
+def test_memory_prompt_store_counts_only_live_prompts():
+    prompts = MemoryPromptStore(ttl=0.05)
+    prompts.put("r1", "a")
+    prompts.put("r2", "b")
+    assert len(prompts) == 2
+    time.sleep(0.1)
+    assert len(prompts) == 0
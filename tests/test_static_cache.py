@@ -0,0 +1,37 @@
+from static_cache import StaticCache
+
+
+def test_aliases_of_a_file_share_one_entry(tmp_path):
+    (tmp_path / "index.html").write_text("<html>" + "hello " * 200 + "</html>")
+    (tmp_path / "x").mkdir()
+    cache = StaticCache(str(tmp_path))
+
+    first = cache.get("index.html")
+    for alias in ("./index.html", "././index.html", "x/../index.html", "x/./../index.html"):
+        assert cache.get(alias) is first
+    assert list(cache._assets) == ["index.html"]
+
+
+def test_paths_outside_the_directory_are_not_served(tmp_path):
+    (tmp_path / "static").mkdir()
+    (tmp_path / "secret.txt").write_text("secret")
+    cache = StaticCache(str(tmp_path / "static"))
+    assert cache.get("../secret.txt") is None
+    assert not cache._assets
+
+
+def test_static_routes_answer_head_and_bad_paths():
+    from fastapi.testclient import TestClient
+
+    import app
+
+    client = TestClient(app.app)
+    assert client.get("/static/%00").status_code == 404
+    assert client.get("/static/..%2f..%2fetc%2fpasswd").status_code == 404
+
+    get = client.get("/", headers={"accept-encoding": "identity"})
+    head = client.head("/", headers={"accept-encoding": "identity"})
+    assert head.status_code == 200
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(get.content))
+    assert head.headers["etag"] == get.headers["etag"]